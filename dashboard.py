@@ -3,10 +3,30 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import networkx as nx
+import numpy as np
+import os
+import sys
+
+# Pipeline modules live in src/ (the scrapers run them as top-level scripts)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from table_store import load_table, table_path, table_fingerprint, watch_table
+from derive_columns import dashboard_frame
+from filter_index import FilterIndex, RouteIndex
+from flow_cube import build_flow_cube, roll_up_flows
+from graph_layout import LayoutCache, grid_force_layout
+from render_profiler import RenderProfiler, PROFILE_FILE
 
 # --- CONFIG ---
-DATA_FILE = "data/processed/transfer_base_table.csv"
 st.set_page_config(layout="wide", page_title="Romanian Football Analytics Hub")
+LARGE_GRAPH_NODES = 400  # above this the network tab switches to the scalable rendering path
+LABEL_TOP_N = 40  # large graphs only label this many clubs (by degree)
+WATCH_DATA = os.environ.get("DASHBOARD_WATCH_DATA") == "1"  # reload in the background when the table is saved
+# Developer panel with per-section render timings: DASHBOARD_PROFILE=1 or ?profile=1
+PROFILE = os.environ.get("DASHBOARD_PROFILE") == "1" or st.query_params.get("profile") == "1"
+
+# One profiler per browser session, so the rolling history survives reruns
+profiler = st.session_state.setdefault("profiler", RenderProfiler()) if PROFILE else RenderProfiler()
+if PROFILE: profiler.begin(memory=st.session_state.get("profile_memory", False))
 
 # --- 🎨 THEME OVERRIDE (CSS) ---
 # FIXED: Removed the broken slider CSS. Only coloring the Multiselect Tags blue now.
@@ -18,80 +38,42 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
-
-# --- HELPER FUNCTIONS ---
-def calculate_age(row):
-    try:
-        if pd.isna(row['Date_of_Birth']): return None
-        dob_str = str(row['Date_of_Birth'])
-        if '/' in dob_str:
-            birth_year = int(dob_str.split('/')[-1])
-        elif '-' in dob_str:
-            birth_year = int(dob_str.split('-')[0])
-        else:
-            return None
-        season_start = int("20" + str(row['Season']).split('/')[0])
-        return season_start - birth_year
-    except:
-        return None
-
-def normalize_transfer_type(row):
-    t_type = str(row['Transfer_Type']).lower()
-    fee_val = float(row['Fee_Est_M']) if pd.notna(row['Fee_Est_M']) else 0.0
-    if "loan" in t_type: return "Loan"
-    elif fee_val > 0: return "Fee"
-    else: return "Free"
-
-def classify_migration(row):
-    origin_ro = row['Origin_Country'] == 'Romania'
-    dest_ro = row['Destination_Country'] == 'Romania'
-    citizenship = str(row['Citizenship']).strip()
-    is_national = 'Romania' in citizenship 
-    
-    if origin_ro and dest_ro:
-        return "Domestic Move"
-    elif origin_ro and not dest_ro:
-        return "Export (Out)"
-    elif not origin_ro and dest_ro:
-        if is_national:
-            return "Repatriation (Return)"
-        else:
-            return "Foreign Import"
-    else:
-        return "External"
+profiler.lap("page setup")
 
 # --- LOAD DATA ---
-@st.cache_data(ttl=60)
-def load_data():
+# cache_resource hands every rerun the same frame + indexes instead of unpickling a fresh
+# copy; nothing below mutates df in place. It is keyed on the table's content fingerprint,
+# so data is re-read exactly when the file changes (no ttl) and only one copy is kept.
+# The flow cube (and its own index) is what the Sankey rolls up, so its cost follows the
+# number of distinct routes, not transfers.
+@st.cache_resource(max_entries=1)
+def load_data(fingerprint):
     try:
-        df = pd.read_csv(DATA_FILE, low_memory=False)
-        bad_values = ["TBD", "Unknown", "nan", "Retired", "Without Club", "Disqualification"]
-        mask = (
-            (~df['Origin_League'].isin(bad_values)) & 
-            (~df['Destination_League'].isin(bad_values)) &
-            (df['Origin_League'].notna()) & 
-            (df['Destination_League'].notna()) &
-            (df['Origin_Country'].notna()) & 
-            (df['Destination_Country'].notna())
-        )
-        data = df[mask].copy()
-        
-        data['Origin_Label'] = data['Origin_Country'] + ": " + data['Origin_League']
-        data['Destination_Label'] = data['Destination_Country'] + ": " + data['Destination_League']
-        data['Age'] = data.apply(calculate_age, axis=1)
-        data['Fee_Est_M'] = pd.to_numeric(data['Fee_Est_M'], errors='coerce').fillna(0.0)
-        data['UI_Type'] = data.apply(normalize_transfer_type, axis=1)
-        data['Migration_Type'] = data.apply(classify_migration, axis=1)
-        
-        return data
+        # Age / UI_Type / Migration_Type / labels are materialized by save_table()
+        data = dashboard_frame(load_table())
+        cube = build_flow_cube(data)
+        return data, FilterIndex(data), RouteIndex(data), cube, FilterIndex(cube)
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, None, pd.DataFrame(), None
+
+# Optional: rebuild as soon as the file is saved, so the next rerun doesn't pay for it
+@st.cache_resource
+def data_watcher():
+    return watch_table(lambda: load_data(table_fingerprint()))
 
-df = load_data()
+if WATCH_DATA: data_watcher()
+
+df, fidx, routes, cube, cube_idx = load_data(table_fingerprint())
+profiler.lap("load_data")
+
+# One layout cache per server process, shared by all sessions and reruns
+@st.cache_resource
+def layout_cache():
+    return LayoutCache(maxsize=32)
 
 if df.empty:
-    st.error(f"❌ Data file not found: {DATA_FILE}")
+    st.error(f"❌ Data file not found: {table_path()}")
     st.stop()
 
 # ==============================================================================
@@ -145,16 +127,20 @@ if "Fee" in selected_types:
     slider_max = float(max_fee_data) if max_fee_data > 0 else 5.0
     min_fee = st.sidebar.slider("💰 Min. Fee (€ Millions)", 0.0, slider_max, 0.0, 0.05)
 
-# Apply Global Filters
-filtered_df = df[df['Season'].isin(selected_seasons)].copy()
-filtered_df = filtered_df[
-    (filtered_df['Age'] >= selected_age[0]) & 
-    (filtered_df['Age'] <= selected_age[1]) &
-    (filtered_df['UI_Type'].isin(selected_types))
-]
-if min_fee > 0:
-    condition = (filtered_df['UI_Type'] != 'Fee') | (filtered_df['Fee_Est_M'] >= min_fee)
-    filtered_df = filtered_df[condition]
+# Apply Global Filters (bitmap AND/OR on the index; frames are only taken per tab).
+# Works on both the row index and the cube index, which share the same columns.
+def global_filter(idx):
+    bits = (
+        idx.isin('Season', selected_seasons) &
+        idx.age_between(selected_age[0], selected_age[1]) &
+        idx.isin('UI_Type', selected_types)
+    )
+    if min_fee > 0:
+        bits &= ~idx.eq('UI_Type', 'Fee') | idx.fee_at_least(min_fee)
+    return bits
+
+global_bits = global_filter(fidx)
+profiler.lap("sidebar + global filter")
 
 # --- TABS ---
 tab1, tab2 = st.tabs(["🗺️ Player Transit Map (Sankey)", "🕸️ Club Networks (Partnerships)"])
@@ -190,22 +176,23 @@ with tab1:
                 selected_migrations = ["Domestic Move"]
 
     # Filter Data
-    sankey_df = filtered_df.copy()
-    sankey_df = sankey_df[sankey_df['Migration_Type'].isin(selected_migrations)]
-
-    if view_mode == "Imports (In to RO)":
-        sankey_df = sankey_df[(sankey_df['Origin_Country'] != "Romania") & (sankey_df['Destination_Country'] == "Romania")]
-    elif view_mode == "Exports (Out of RO)":
-        sankey_df = sankey_df[(sankey_df['Origin_Country'] == "Romania") & (sankey_df['Destination_Country'] != "Romania")]
-    elif view_mode == "Internal (Domestic)":
-        sankey_df = sankey_df[
-            (sankey_df['Origin_Country'] == "Romania") & 
-            (sankey_df['Destination_Country'] == "Romania") & 
-            (sankey_df['Origin_League'] != sankey_df['Destination_League']) 
-        ]
-
-    flows = sankey_df.groupby(['Origin_Label', 'Destination_Label']).size().reset_index(name='Count')
-    flows = flows[flows['Count'] >= min_flow]
+    def sankey_filter(idx, bits):
+        bits = bits & idx.isin('Migration_Type', selected_migrations)
+        if view_mode == "Imports (In to RO)":
+            bits &= ~idx.eq('Origin_Country', "Romania") & idx.eq('Destination_Country', "Romania")
+        elif view_mode == "Exports (Out of RO)":
+            bits &= idx.eq('Origin_Country', "Romania") & ~idx.eq('Destination_Country', "Romania")
+        elif view_mode == "Internal (Domestic)":
+            bits &= (
+                idx.eq('Origin_Country', "Romania") & 
+                idx.eq('Destination_Country', "Romania") & 
+                idx.cross_league
+            )
+        return bits
+
+    # Flows come from the pre-aggregated cube; transfer rows are only taken for the Path Analyzer
+    flows = roll_up_flows(cube.iloc[cube_idx.rows(sankey_filter(cube_idx, global_filter(cube_idx)))], min_flow)
+    profiler.lap("sankey: filter + roll-up")
 
     if not flows.empty:
         all_nodes = list(pd.concat([flows['Origin_Label'], flows['Destination_Label']]).unique())
@@ -244,18 +231,23 @@ with tab1:
         fig = go.Figure(data=[go.Sankey(
             textfont=dict(size=13, color="black", family="Arial Black"),
             node=dict(pad=20, thickness=20, line=dict(color="black", width=0.5), label=all_nodes, color=node_colors, hovertemplate='<b>%{label}</b><br>Volume: %{value}<extra></extra>'),
-            link=dict(source=flows['Source_ID'], target=flows['Target_ID'], value=flows['Count'], color=link_colors, hovertemplate='%{source.label} ➔ %{target.label}<br><b>%{value} Players</b><extra></extra>')
+            link=dict(source=flows['Source_ID'], target=flows['Target_ID'], value=flows['Count'], customdata=flows['Fee_Sum'], color=link_colors, hovertemplate='%{source.label} ➔ %{target.label}<br><b>%{value} Players</b><br>Fees: €%{customdata:.2f}M<extra></extra>')
         )])
         fig.update_layout(height=max(600, len(all_nodes) * 35), margin=dict(l=10, r=10, t=30, b=30))
+        profiler.lap("sankey: figure")
         st.plotly_chart(fig, use_container_width=True)
+        profiler.lap("sankey: plotly serialize")
         
         st.markdown("---")
         st.subheader("🕵️ Path Analyzer")
-        flow_options = flows.apply(lambda x: f"{x['Origin_Label']} ➔ {x['Destination_Label']} ({x['Count']} players)", axis=1).tolist()
-        selected_flow = st.selectbox("Select a Route to Inspect:", ["Select a route..."] + sorted(flow_options))
-        if selected_flow and selected_flow != "Select a route...":
-            parts = selected_flow.split(" ➔ ")
-            inspector_df = sankey_df[(sankey_df['Origin_Label'] == parts[0]) & (sankey_df['Destination_Label'] == parts[1].split(" (")[0])]
+        # Options are (origin, destination) keys; the text is only a format_func
+        route_counts = dict(zip(zip(flows['Origin_Label'], flows['Destination_Label']), flows['Count']))
+        selected_route = st.selectbox(
+            "Select a Route to Inspect:", [None] + sorted(route_counts),
+            format_func=lambda route: "Select a route..." if route is None else f"{route[0]} ➔ {route[1]} ({route_counts[route]} players)"
+        )
+        if selected_route is not None:
+            inspector_df = df.iloc[routes.rows(selected_route, sankey_filter(fidx, global_bits))]
             
             citizenship_counts = inspector_df['Citizenship'].value_counts().reset_index()
             citizenship_counts.columns = ['Nation', 'Count']
@@ -276,6 +268,7 @@ with tab1:
                 st.dataframe(manifest, use_container_width=True, hide_index=True)
     else:
         st.warning("⚠️ No transfers found.")
+    profiler.lap("path analyzer")
 
 # ==============================================================================
 # TAB 2: CLUB NETWORK
@@ -286,16 +279,18 @@ with tab2:
     with c_net1: network_scope = st.radio("Network Scope", ["SuperLiga Internal", "SuperLiga ↔ Liga 2", "All Domestic"])
     with c_net2: min_strength = st.slider("Minimum Transfers Made", 1, 20, 3, key="net_strength")
 
-    net_df = filtered_df.copy()
+    net_bits = global_bits
     if network_scope == "SuperLiga Internal":
-        net_df = net_df[(net_df['Origin_League'] == 'Superliga') & (net_df['Destination_League'] == 'Superliga') & (net_df['Origin_Country'] == 'Romania')]
+        net_bits = net_bits & fidx.eq('Origin_League', 'Superliga') & fidx.eq('Destination_League', 'Superliga') & fidx.eq('Origin_Country', 'Romania')
     elif network_scope == "SuperLiga ↔ Liga 2":
-        net_df = net_df[((net_df['Origin_League'] == 'Superliga') & (net_df['Destination_League'] == 'Liga 2')) | ((net_df['Origin_League'] == 'Liga 2') & (net_df['Destination_League'] == 'Superliga'))]
+        net_bits = net_bits & ((fidx.eq('Origin_League', 'Superliga') & fidx.eq('Destination_League', 'Liga 2')) | (fidx.eq('Origin_League', 'Liga 2') & fidx.eq('Destination_League', 'Superliga')))
     elif network_scope == "All Domestic":
-        net_df = net_df[(net_df['Origin_Country'] == 'Romania') & (net_df['Destination_Country'] == 'Romania')]
+        net_bits = net_bits & fidx.eq('Origin_Country', 'Romania') & fidx.eq('Destination_Country', 'Romania')
+    net_df = df.iloc[fidx.rows(net_bits)]
     
     edges_df = net_df.groupby(['Origin_Club', 'Destination_Club']).size().reset_index(name='Weight')
     edges_df = edges_df[edges_df['Weight'] >= min_strength]
+    profiler.lap("network: filter + edges")
 
     if not edges_df.empty:
         unique_clubs = sorted(list(set(edges_df['Origin_Club']).union(set(edges_df['Destination_Club']))))
@@ -322,29 +317,51 @@ with tab2:
              st.warning(f"No connections found.")
         else:
             G = nx.from_pandas_edgelist(edges_df, 'Origin_Club', 'Destination_Club', ['Weight'])
-            pos = nx.spring_layout(G, k=2.0, seed=42, iterations=50)
-            edge_x, edge_y = [], []
-            for edge in G.edges(data=True):
-                x0, y0 = pos[edge[0]]
-                x1, y1 = pos[edge[1]]
-                edge_x.extend([x0, x1, None])
-                edge_y.extend([y0, y1, None])
-            edge_trace = go.Scatter(x=edge_x, y=edge_y, line=dict(width=1, color='#888'), hoverinfo='none', mode='lines')
-            node_x, node_y, node_text, node_size, node_colors = [], [], [], [], []
-            for node in G.nodes():
-                x, y = pos[node]
-                node_x.append(x)
-                node_y.append(y)
-                in_degree = G.degree(node)
-                node_size.append(10 + (in_degree * 2))
-                if focus_club != "Show Whole Network" and node == focus_club: node_colors.append("red")
-                else: node_colors.append("#1f77b4")
-            node_trace = go.Scatter(x=node_x, y=node_y, mode='markers+text', text=[node for node in G.nodes()], textposition="top center", hoverinfo='text', marker=dict(showscale=False, color=node_colors, size=node_size, line_width=2))
-            node_trace.textfont = dict(size=10, color="black")
+            if G.number_of_nodes() > LARGE_GRAPH_NODES:
+                # Large graphs: grid-approximated layout, array-built traces, WebGL, labels
+                # only on the best-connected clubs (everything still shows on hover)
+                pos = layout_cache().layout(G, grid_force_layout, iterations=50)
+                profiler.lap("network: layout")
+                nodes = pd.Index(list(G.nodes()))
+                xy = np.array([pos[node] for node in nodes])
+                ends = nodes.get_indexer(np.array(list(G.edges()), dtype=object).ravel()).reshape(-1, 2)
+                gaps = np.full(len(ends), np.nan)
+                edge_x = np.column_stack([xy[ends[:, 0], 0], xy[ends[:, 1], 0], gaps]).ravel()
+                edge_y = np.column_stack([xy[ends[:, 0], 1], xy[ends[:, 1], 1], gaps]).ravel()
+                edge_trace = go.Scattergl(x=edge_x, y=edge_y, line=dict(width=0.5, color='#888'), hoverinfo='none', mode='lines')
+                degree = np.array([d for _, d in G.degree(nodes)])
+                is_focus = nodes == focus_club
+                labeled = np.zeros(len(nodes), dtype=bool)
+                labeled[np.argsort(-degree, kind='stable')[:LABEL_TOP_N]] = True
+                node_text = np.where(labeled | is_focus, nodes, "")
+                node_trace = go.Scattergl(x=xy[:, 0], y=xy[:, 1], mode='markers+text', text=node_text, hovertext=nodes, textposition="top center", hoverinfo='text', marker=dict(showscale=False, color=np.where(is_focus, "red", "#1f77b4"), size=np.minimum(6 + degree, 30), line_width=1))
+            else:
+                pos = layout_cache().spring_layout(G, k=2.0, seed=42, iterations=50)
+                profiler.lap("network: layout")
+                edge_x, edge_y = [], []
+                for edge in G.edges(data=True):
+                    x0, y0 = pos[edge[0]]
+                    x1, y1 = pos[edge[1]]
+                    edge_x.extend([x0, x1, None])
+                    edge_y.extend([y0, y1, None])
+                edge_trace = go.Scatter(x=edge_x, y=edge_y, line=dict(width=1, color='#888'), hoverinfo='none', mode='lines')
+                node_x, node_y, node_text, node_size, node_colors = [], [], [], [], []
+                for node in G.nodes():
+                    x, y = pos[node]
+                    node_x.append(x)
+                    node_y.append(y)
+                    in_degree = G.degree(node)
+                    node_size.append(10 + (in_degree * 2))
+                    if focus_club != "Show Whole Network" and node == focus_club: node_colors.append("red")
+                    else: node_colors.append("#1f77b4")
+                node_trace = go.Scatter(x=node_x, y=node_y, mode='markers+text', text=[node for node in G.nodes()], textposition="top center", hoverinfo='text', marker=dict(showscale=False, color=node_colors, size=node_size, line_width=2))
+                node_trace.textfont = dict(size=10, color="black")
             fig_net = go.Figure(data=[edge_trace, node_trace], layout=go.Layout(showlegend=False, hovermode='closest', margin=dict(b=0,l=0,r=0,t=0), height=700, xaxis=dict(showgrid=False, zeroline=False, showticklabels=False), yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)))
             
+            profiler.lap("network: figure")
             c_g, c_d = st.columns([2.5, 1.5])
             with c_g: st.plotly_chart(fig_net, use_container_width=True)
+            profiler.lap("network: plotly serialize")
             with c_d:
                 st.markdown(f"### 🏆 {table_title}")
                 display_df = edges_df.copy()
@@ -356,4 +373,26 @@ with tab2:
                 
                 st.dataframe(display_df.sort_values(by='# of transfers', ascending=False), use_container_width=True, hide_index=True)
     else:
-        st.warning("⚠️ No connections found.")
\ No newline at end of file
+        st.warning("⚠️ No connections found.")
+profiler.lap("network: table")
+
+# ==============================================================================
+# ⏱️ DEVELOPER PANEL: RENDER PROFILE
+# ==============================================================================
+# Drawn last, so its own widgets aren't part of the timings
+if PROFILE:
+    run = profiler.end()
+    with st.sidebar.expander("⏱️ Render Profile", expanded=True):
+        st.checkbox("Sample memory (tracemalloc)", key="profile_memory", help="Applies from the next rerun; slows every section down")
+        st.caption(f"Rerun #{run['rerun']}: **{run['total_ms']:.0f} ms**")
+        st.dataframe(profiler.sections_frame(run), hide_index=True, use_container_width=True,
+                     column_config={'ms': st.column_config.NumberColumn(format="%.1f"),
+                                    'share': st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="percent")})
+        st.markdown(f"**Last {len(profiler.history)} reruns (ms)**")
+        st.bar_chart(profiler.history_frame(), height=220)
+        c_p1, c_p2 = st.columns(2)
+        with c_p1:
+            if st.button("💾 Dump to file"):
+                st.success(f"{profiler.dump()} reruns appended to {PROFILE_FILE}")
+        with c_p2:
+            st.download_button("⬇️ JSON", profiler.to_json(), file_name="dashboard_profile.json", mime="application/json")
@@ -1,10 +1,122 @@
 import pandas as pd
+import argparse
+import difflib
 import os
+import re
+import unicodedata
+from collections import defaultdict
+from table_store import load_table, table_output
+from create_mapping import KNOWN_ALIASES
 
-def audit_club_names():
+# --- CONFIG ---
+SUGGESTIONS_FILE = table_output("data/processed/club_alias_suggestions.csv")
+CLUB_LIST_FILE = table_output("data/processed/unique_club_names.txt")
+MIN_SCORE = 0.75
+MAX_BLOCK_SIZE = 300  # trigrams shared by more names than this ("fc ", "ul ") don't block anything
+MIN_SHARED_GRAMS = 2
+# Legal-form prefixes that say nothing about which club it is
+STOP_TOKENS = {"fc", "cs", "acs", "afc", "csm", "acsm", "sc", "fk", "cf", "csc", "acsc", "asfc", "club"}
+# Second / youth teams are separate clubs: "Sepsi OSK II" must never merge into "Sepsi OSK"
+TEAM_SUFFIX = re.compile(r"\b(ii|iii|b|u\d{2}|youth|yl)\b")
+
+def normalize_club(name):
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(t for t in tokens if t not in STOP_TOKENS) or " ".join(tokens)
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def name_similarity(a, b):
+    """Edit-style ratio, or token containment ("minaur" in "minaur baia mare")."""
+    ratio = difflib.SequenceMatcher(None, a, b).ratio()
+    ta, tb = set(a.split()), set(b.split())
+    containment = len(ta & tb) / min(len(ta), len(tb)) if ta and tb else 0.0
+    return max(ratio, 0.95 * containment)
+
+def club_evidence(df):
+    """Per-name Club_IDs, counterpart clubs and row counts, plus direct-transfer counts per pair."""
+    sides = pd.concat([
+        df[['Origin_Club', 'Origin_Club_ID', 'Destination_Club']].set_axis(['Club', 'Club_ID', 'Partner'], axis=1),
+        df[['Destination_Club', 'Destination_Club_ID', 'Origin_Club']].set_axis(['Club', 'Club_ID', 'Partner'], axis=1),
+    ], ignore_index=True).dropna(subset=['Club'])
+    sides['Club'] = sides['Club'].astype(str)
+    ids = sides.dropna(subset=['Club_ID']).groupby('Club')['Club_ID'].agg(lambda s: set(s.astype(int)))
+    partners = sides.dropna(subset=['Partner']).groupby('Club')['Partner'].agg(lambda s: set(s.astype(str)))
+    rows = sides.groupby('Club').size()
+    direct = df.dropna(subset=['Origin_Club', 'Destination_Club']).groupby(['Origin_Club', 'Destination_Club']).size()
+    return ids.to_dict(), partners.to_dict(), rows.to_dict(), direct.to_dict()
+
+def candidate_pairs(names, normalized, ids):
+    """Trigram blocking: only names sharing MIN_SHARED_GRAMS selective trigrams are compared,
+    plus every pair of names recorded under the same Club_ID."""
+    postings = defaultdict(list)
+    for i, norm in enumerate(normalized):
+        for gram in trigrams(norm):
+            postings[gram].append(i)
+    shared = defaultdict(int)
+    for members in postings.values():
+        if len(members) > MAX_BLOCK_SIZE: continue
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                shared[(a, b)] += 1
+    pairs = {pair for pair, count in shared.items() if count >= MIN_SHARED_GRAMS}
+
+    by_id = defaultdict(list)
+    for i, name in enumerate(names):
+        for club_id in ids.get(name, ()):
+            by_id[club_id].append(i)
+    for members in by_id.values():
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+def suggest_aliases(df, min_score=MIN_SCORE):
+    """Ranked alias suggestions in the club_name_mapping.csv shape (Variant_Name -> Standard_Name),
+    with the evidence behind each score. Pairs KNOWN_ALIASES already unifies are skipped."""
+    ids, partners, rows, direct = club_evidence(df)
+    names = sorted(rows)
+    normalized = [normalize_club(n) for n in names]
+    suffixes = [frozenset(TEAM_SUFFIX.findall(n)) for n in normalized]
+
+    suggestions = []
+    for a, b in candidate_pairs(names, normalized, ids):
+        name_a, name_b = names[a], names[b]
+        if suffixes[a] != suffixes[b]: continue
+        if KNOWN_ALIASES.get(name_a, name_a) == KNOWN_ALIASES.get(name_b, name_b): continue
+
+        similarity = name_similarity(normalized[a], normalized[b])
+        ids_a, ids_b = ids.get(name_a, set()), ids.get(name_b, set())
+        shared_id = bool(ids_a & ids_b)
+        distinct_ids = bool(ids_a and ids_b and not shared_id)
+        pa, pb = partners.get(name_a, set()), partners.get(name_b, set())
+        overlap = len(pa & pb) / len(pa | pb) if pa | pb else 0.0
+        # A transfer between the two names means they're two different clubs
+        transfers_between = direct.get((name_a, name_b), 0) + direct.get((name_b, name_a), 0)
+
+        score = similarity + 0.3 * shared_id - 0.3 * distinct_ids + 0.2 * overlap - 0.3 * (transfers_between > 0)
+        if score < min_score: continue
+
+        # The longer (more official-looking) name is the standard, as in KNOWN_ALIASES
+        variant, standard = sorted([name_a, name_b], key=lambda n: (len(n.split()), rows[n], n))
+        suggestions.append({
+            'Variant_Name': variant, 'Standard_Name': standard, 'Score': round(score, 3),
+            'Similarity': round(similarity, 3), 'Shared_Club_ID': shared_id, 'Distinct_Club_IDs': distinct_ids,
+            'Partner_Overlap': round(overlap, 3), 'Direct_Transfers': transfers_between,
+            'Variant_Rows': rows[variant], 'Standard_Rows': rows[standard],
+        })
+
+    columns = ['Variant_Name', 'Standard_Name', 'Score', 'Similarity', 'Shared_Club_ID', 'Distinct_Club_IDs',
+               'Partner_Overlap', 'Direct_Transfers', 'Variant_Rows', 'Standard_Rows']
+    result = pd.DataFrame(suggestions, columns=columns)
+    return result.sort_values(['Score', 'Similarity'], ascending=False, ignore_index=True)
+
+def audit_club_names(min_score=MIN_SCORE):
     # Load the final dataset
     try:
-        df = pd.read_csv("data/processed/transfer_base_table.csv")
+        df = load_table(columns=['Origin_Club', 'Origin_Club_ID', 'Destination_Club', 'Destination_Club_ID'])
     except FileNotFoundError:
         print("❌ Error: Processed data not found. Run scraper first.")
         return
@@ -12,27 +124,39 @@ def audit_club_names():
     # Collect all names from both Origin and Destination
     origins = df['Origin_Club'].unique()
     destinations = df['Destination_Club'].unique()
-    
+
     # Combine and deduplicate
     all_clubs = set(origins) | set(destinations)
-    
+
     # Sort alphabetically (Crucial for spotting duplicates next to each other)
     sorted_clubs = sorted([str(x) for x in all_clubs])
-    
+
     # Save to a text file for easy manual review
-    output_path = "data/processed/unique_club_names.txt"
-    os.makedirs('data/processed', exist_ok=True)
-    
+    output_path = CLUB_LIST_FILE
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(f"--- UNIQUE CLUBS FOUND: {len(sorted_clubs)} ---\n")
         f.write("Review this list for duplicates (e.g. 'Minaur' vs 'Minaur Baia Mare')\n")
+        f.write(f"Ranked candidates are in {SUGGESTIONS_FILE}\n")
         f.write("If you find duplicates, add them to src/create_mapping.py\n\n")
-        
+
         for club in sorted_clubs:
             f.write(f"{club}\n")
-            
+
     print(f"✅ Audit Complete. Found {len(sorted_clubs)} unique club names.")
     print(f"📄 Open '{output_path}' to review the list.")
 
+    # --- DUPLICATE CANDIDATES ---
+    suggestions = suggest_aliases(df, min_score)
+    suggestions.to_csv(SUGGESTIONS_FILE, index=False)
+    print(f"🔎 {len(suggestions)} alias suggestions (score >= {min_score}) -> '{SUGGESTIONS_FILE}'")
+    for _, s in suggestions.head(10).iterrows():
+        print(f"   {s['Score']:.2f}  \"{s['Variant_Name']}\": \"{s['Standard_Name']}\",")
+    print("   Accepted rows can be pasted into KNOWN_ALIASES as shown.")
+
 if __name__ == "__main__":
-    audit_club_names()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Audit club names and suggest aliases for create_mapping.py")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE, help="Drop suggestions scoring below this")
+    args = parser.parse_args()
+    audit_club_names(args.min_score)
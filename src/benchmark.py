@@ -0,0 +1,444 @@
+import pandas as pd
+import numpy as np
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import hashlib
+from table_store import apply_schema
+from derive_columns import dashboard_frame, derive_dashboard_columns, DERIVED_COLUMNS
+from filter_index import FilterIndex, RouteIndex
+from flow_cube import build_flow_cube, roll_up_flows
+from html_parsing import available_backends, set_backend, BACKENDS
+import transfer_history_scraper as history_scraper
+import club_list_urls_scraper as url_scraper
+import enrich_data
+
+# --- CONFIG ---
+TABLE_COPY = "data/raw/transfer_base_table_copy_2.csv"  # frozen copy, so runs stay comparable
+FIXTURE_DIR = "data/fixtures/html"
+FIXTURE_MANIFEST = "manifest.json"
+RESULTS_FILE = "data/processed/benchmark_results.json"
+BASELINE_FILE = "data/fixtures/benchmark_baseline.json"
+REGRESSION_THRESHOLD = 0.15  # best-of-N time slower than the baseline by more than this fails --compare
+PLAYER_FIXTURES = 300
+REPEAT = 5
+
+# --- FIXTURES ---
+# manifest.json: {"source": "recorded" | "synthetic", "pages": [{kind, file, url, ...}]}
+#   kind "transfer": club_name; kind "league": league, season; kind "player": player_id, player_name
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or "club"
+
+def format_money(value_m):
+    if pd.isna(value_m) or value_m <= 0: return "-"
+    return f"€{value_m:.2f}m" if value_m >= 1 else f"€{value_m * 1000:.0f}k"
+
+def format_fee(fee_raw):
+    fee = "-" if pd.isna(fee_raw) else str(fee_raw)
+    return f"€{fee}" if re.match(r'^\d[\d.]*[km]$', fee) else fee
+
+def format_dob(dob):
+    # The table keeps TM's d/m/yyyy; the page header pads it
+    parts = str(dob).split('/')
+    if len(parts) != 3: return str(dob)
+    return f"{int(parts[0]):02d}/{int(parts[1]):02d}/{parts[2]}"
+
+def club_link(name, club_id):
+    if pd.isna(club_id):
+        return f'{name}'
+    return f'<a title="{name}" href="/{slugify(name)}/startseite/verein/{int(club_id)}">{name}</a>'
+
+def synth_transfer_page(df, club_name, club_id):
+    boxes = []
+    for side, partner, headline in [('Destination', 'Origin', 'Arrivals'), ('Origin', 'Destination', 'Departures')]:
+        club_rows = df[df[f'{side}_Club_ID'] == club_id]
+        for season, rows in club_rows.groupby('Season', sort=True):
+            body = "".join(
+                f'<tr class="odd"><td class="hauptlink"><a href="/{slugify(r.Player_Name)}/profil/spieler/{r.TM_Player_ID}">{r.Player_Name}</a></td>'
+                f'<td class="zentriert">{season}</td>'
+                f'<td class="no-border-links">{club_link(getattr(r, f"{partner}_Club"), getattr(r, f"{partner}_Club_ID"))}</td>'
+                f'<td class="rechts">{format_fee(r.Fee_Raw)}</td></tr>'
+                for r in rows.itertuples())
+            boxes.append(f'<div class="box"><h2 class="content-box-headline">{headline} {season}</h2>'
+                         f'<table class="items"><thead><tr><th>Player</th><th>Season</th><th>Club</th><th>Fee</th></tr></thead>'
+                         f'<tbody>{body}</tbody></table></div>')
+    return (f'<html><head><title>{club_name} - Transfer history</title></head><body>'
+            f'<div class="box"><h2 class="content-box-headline">{club_name}</h2></div>{"".join(boxes)}</body></html>')
+
+def synth_league_page(clubs):
+    body = "".join(
+        f'<tr><td class="zentriert"><a href="/{slugify(name)}/startseite/verein/{club_id}"><img alt="{name}"></a></td>'
+        f'<td class="hauptlink no-border-links"><a class="vereinprofil_tooltip" title="{name}" '
+        f'href="/{slugify(name)}/startseite/verein/{club_id}">{name}</a></td></tr>'
+        for name, club_id in clubs)
+    return f'<html><head></head><body><table class="items"><thead><tr><th>Club</th></tr></thead><tbody>{body}</tbody></table></body></html>'
+
+def synth_player_page(rows):
+    first = rows.iloc[0]
+    flags = "".join(f'<img class="flaggenrahmen" title="{c}" alt="{c}">' for c in str(first['Citizenship']).split(' / ')) \
+        if pd.notna(first['Citizenship']) else ""
+    header = (f'<ul><li class="data-header__label">Date of birth/Age: <span class="data-header__content">'
+              f'<span itemprop="birthDate">{format_dob(first["Date_of_Birth"])}</span></span></li>'
+              f'<li class="data-header__label">Citizenship: <span class="data-header__content">{flags}</span></li></ul>'
+              f'<div class="data-header__market-value-wrapper">{format_money(rows["Market_Value_Next_Season"].iloc[-1])}</div>')
+    grid = ['<div class="tm-player-transfer-history-grid tm-player-transfer-history-grid--heading">'
+            '<div class="tm-player-transfer-history-grid__season">Season</div></div>']
+    for r in rows.itertuples():
+        grid.append(f'<div class="tm-player-transfer-history-grid">'
+                    f'<div class="tm-player-transfer-history-grid__season">{r.Season}</div>'
+                    f'<div class="tm-player-transfer-history-grid__old-club"><a class="tm-player-transfer-history-grid__club-link">{r.Origin_Club}</a></div>'
+                    f'<div class="tm-player-transfer-history-grid__new-club"><a class="tm-player-transfer-history-grid__club-link">{r.Destination_Club}</a></div>'
+                    f'<div class="tm-player-transfer-history-grid__market-value">{format_money(r.Market_Value_At_Transfer)}</div>'
+                    f'<div class="tm-player-transfer-history-grid__fee">{format_fee(r.Fee_Raw)}</div></div>')
+    return f'<html><head></head><body><header>{header}</header><div class="box">{"".join(grid)}</div></body></html>'
+
+def fixture_targets(df):
+    """The pages a scrape of this table visits: (kind, url, meta) per club, league table and player."""
+    targets = []
+    urls = pd.read_csv(history_scraper.CLUB_URLS_FILE)
+    for club in urls.itertuples():
+        targets.append(("transfer", club.Transfer_URL, {'club_name': club.Club_Name, 'club_id': int(club.Club_ID)}))
+    for league, season, url in url_scraper.LEAGUE_CONFIG:
+        targets.append(("league", url, {'league': league, 'season': season}))
+    players = df.drop_duplicates('TM_Player_ID').sort_values('TM_Player_ID').head(PLAYER_FIXTURES)
+    for p in players.itertuples():
+        url = f"https://www.transfermarkt.com/player/transfers/spieler/{p.TM_Player_ID}"
+        targets.append(("player", url, {'player_id': int(p.TM_Player_ID), 'player_name': p.Player_Name}))
+    return targets
+
+def write_fixtures(pages, source, fixture_dir=FIXTURE_DIR):
+    manifest = {'source': source, 'pages': []}
+    for i, (kind, url, meta, html) in enumerate(pages):
+        os.makedirs(os.path.join(fixture_dir, kind), exist_ok=True)
+        name = os.path.join(kind, f"{i:04d}.html")
+        with open(os.path.join(fixture_dir, name), "wb") as f:
+            f.write(html.encode("utf-8") if isinstance(html, str) else html)
+        manifest['pages'].append({'kind': kind, 'file': name, 'url': url, **meta})
+    with open(os.path.join(fixture_dir, FIXTURE_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    counts = pd.Series([p['kind'] for p in manifest['pages']]).value_counts().to_dict()
+    print(f"🧪 Wrote {len(pages)} {source} fixtures to '{fixture_dir}' {counts}")
+
+def record_fixtures(df, fixture_dir=FIXTURE_DIR):
+    """Copies the pages the scrapers fetched from the response cache (stale pages included)."""
+    from http_cache import ResponseCache
+    cache = ResponseCache(offline=True)
+    pages = []
+    for kind, url, meta in fixture_targets(df):
+        html = cache.get(url)
+        if html is not None: pages.append((kind, url, meta, html))
+    if not pages:
+        print("⚠️ No cached pages found. Run the scrapers with the response cache first.")
+        return False
+    write_fixtures(pages, "recorded", fixture_dir)
+    return True
+
+def synthesize_fixtures(df, fixture_dir=FIXTURE_DIR):
+    """Deterministic Transfermarkt-shaped pages built from the frozen table, for trees
+    without recorded fixtures. Same selectors the parsers use; simpler markup than the site."""
+    pages = []
+    history = pd.read_csv(history_scraper.LEAGUE_HISTORY_FILE)
+    urls = pd.read_csv(history_scraper.CLUB_URLS_FILE)
+    ids_by_name = dict(zip(urls['Club_Name'], urls['Club_ID']))
+    for kind, url, meta in fixture_targets(df):
+        if kind == "transfer":
+            html = synth_transfer_page(df, meta['club_name'], meta['club_id'])
+        elif kind == "league":
+            members = history[(history['League'] == meta['league']) & (history['Season'] == meta['season'])]
+            html = synth_league_page([(n, ids_by_name[n]) for n in members['Club_Name'] if n in ids_by_name])
+        else:
+            html = synth_player_page(df[df['TM_Player_ID'] == meta['player_id']])
+        pages.append((kind, url, meta, html))
+    write_fixtures(pages, "synthetic", fixture_dir)
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """Returns (manifest, {url: body}, digest of every fixture byte)."""
+    with open(os.path.join(fixture_dir, FIXTURE_MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    bodies, digest = {}, hashlib.sha256()
+    for page in manifest['pages']:
+        with open(os.path.join(fixture_dir, page['file']), "rb") as f:
+            bodies[page['url']] = f.read()
+        digest.update(bodies[page['url']])
+    return manifest, bodies, digest.hexdigest()
+
+class FixtureCache:
+    """Stands in for ResponseCache (fetch) and HybridFetcher (get): every page is a cache hit,
+    so the scrapers skip their politeness sleeps and only parsing is timed."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def fetch(self, url, headers=None, timeout=30):
+        return self.bodies[url], True
+
+    def get(self, url, ready_class=None):
+        # HybridFetcher returns text (response.text / page_source)
+        body = self.bodies.get(url)
+        return body.decode("utf-8") if body is not None else None
+
+# --- PARSER PARITY ---
+def check_parity(manifest, bodies, reference="bs4"):
+    """Parses every transfer and league fixture with each installed backend and compares
+    the output with bs4's (the reference implementation). Returns the mismatches as
+    (backend, file, detail); a backend that disagrees isn't worth timing."""
+    keep_all = lambda text: True
+    ref = BACKENDS[reference]()
+    mismatches = []
+    for page in manifest['pages']:
+        if page['kind'] not in ("transfer", "league"): continue
+        html = bodies[page['url']]
+        parse = (lambda b: b.transfer_boxes(html, keep_all)) if page['kind'] == "transfer" else (lambda b: b.club_links(html))
+        expected = parse(ref)
+        for name in available_backends():
+            if name == reference: continue
+            got = parse(BACKENDS[name]())
+            if got != expected:
+                flat = lambda result: [row for _, rows in result for row in rows] if page['kind'] == "transfer" else result
+                diff = next(((e, g) for e, g in zip(flat(expected), flat(got)) if e != g),
+                            (f"{len(flat(expected))} items", f"{len(flat(got))} items"))
+                mismatches.append((name, page['file'], f"{reference}: {diff[0]} != {name}: {diff[1]}"))
+    return mismatches
+
+def report_parity(manifest, bodies):
+    mismatches = check_parity(manifest, bodies)
+    pages = sum(p['kind'] in ("transfer", "league") for p in manifest['pages'])
+    if not mismatches:
+        print(f"✅ Parsers agree with bs4 on {pages} pages: {', '.join(available_backends())}")
+        return True
+    print(f"🔴 {len(mismatches)} page(s) parse differently from bs4:")
+    for name, file, detail in mismatches[:10]:
+        print(f"   [{name}] {file}: {detail}")
+    return False
+
+# --- TIMING ---
+@contextlib.contextmanager
+def quiet():
+    """The scrapers print and log per page; keep that out of the measurements."""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+def measure(fn, repeat):
+    with quiet():
+        fn()  # warm-up (imports, regex compilation, first-touch allocations)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return times
+
+def summarize(name, times, items):
+    median = statistics.median(times)
+    return {
+        'name': name, 'items': items, 'repeat': len(times),
+        'min_s': round(min(times), 6), 'median_s': round(median, 6), 'mean_s': round(statistics.fmean(times), 6),
+        'max_s': round(max(times), 6), 'per_item_us': round(median / max(items, 1) * 1e6, 3),
+    }
+
+# --- BENCHMARKS ---
+# Each returns [(name, fn, items)]; fn is timed as a whole, setup is not.
+
+def parser_benchmarks(manifest, bodies):
+    cache = FixtureCache(bodies)
+    transfers = [p for p in manifest['pages'] if p['kind'] == "transfer"]
+    leagues = [p for p in manifest['pages'] if p['kind'] == "league"]
+    players = [p for p in manifest['pages'] if p['kind'] == "player"]
+    cases = []
+    for backend in available_backends():
+        def scrape_history(backend=backend):
+            set_backend(backend)
+            for p in transfers:
+                history_scraper.scrape_complete_history(p['club_name'], p['url'], cache)
+
+        def scan_leagues(backend=backend):
+            set_backend(backend)
+            for p in leagues:
+                url_scraper.extract_clubs_from_table(p['league'], p['season'], p['url'], cache)
+
+        cases.append((f"scrape_complete_history[{backend}]", scrape_history, len(transfers)))
+        cases.append((f"extract_clubs_from_table[{backend}]", scan_leagues, len(leagues)))
+
+    # get_player_data_selenium only wraps the driver in a HybridFetcher; the fixture cache plays that part
+    def player_pages():
+        for p in players:
+            enrich_data.get_player_data(cache, p['player_id'], p['player_name'])
+    cases.append(("get_player_data", player_pages, len(players)))
+    return cases
+
+def money_benchmarks(df):
+    values = [format_fee(v) for v in df['Fee_Raw']] + [format_money(v) for v in df['Market_Value_At_Transfer']]
+    return [
+        ("clean_money[transfer_history_scraper]", lambda: [history_scraper.clean_money(v) for v in values], len(values)),
+        ("clean_money[enrich_data]", lambda: [enrich_data.clean_money(v) for v in values], len(values)),
+    ]
+
+def dashboard_benchmarks(table_file):
+    raw = apply_schema(pd.read_csv(table_file, low_memory=False))
+    data = dashboard_frame(raw)
+    underived = data.drop(columns=[c for c in data.columns if c in DERIVED_COLUMNS])
+    fidx, cube = FilterIndex(data), build_flow_cube(data)
+    cube_idx, routes = FilterIndex(cube), RouteIndex(data)
+    seasons = sorted(data['Season'].unique())
+    view_modes = {
+        "Imports": (["Foreign Import", "Repatriation (Return)"],
+                    lambda idx: ~idx.eq('Origin_Country', "Romania") & idx.eq('Destination_Country', "Romania")),
+        "Exports": (["Export (Out)"],
+                    lambda idx: idx.eq('Origin_Country', "Romania") & ~idx.eq('Destination_Country', "Romania")),
+        "Internal": (["Domestic Move"],
+                     lambda idx: idx.eq('Origin_Country', "Romania") & idx.eq('Destination_Country', "Romania") & idx.cross_league),
+    }
+
+    # Same expressions as the dashboard's global_filter / sankey_filter with the default widgets
+    def global_filter(idx):
+        return idx.isin('Season', seasons) & idx.age_between(16, 38) & idx.isin('UI_Type', ["Loan", "Free", "Fee"])
+
+    def sankey_filter(idx, bits, mode):
+        migrations, direction = view_modes[mode]
+        return bits & idx.isin('Migration_Type', migrations) & direction(idx)
+
+    def sankey_flows():
+        bits = global_filter(cube_idx)
+        return [roll_up_flows(cube.iloc[cube_idx.rows(sankey_filter(cube_idx, bits, mode))], 3) for mode in view_modes]
+
+    imports = roll_up_flows(cube.iloc[cube_idx.rows(sankey_filter(cube_idx, global_filter(cube_idx), "Imports"))], 3)
+    top_routes = list(zip(imports['Origin_Label'], imports['Destination_Label']))[:20]
+
+    def path_analyzer():
+        bits = sankey_filter(fidx, global_filter(fidx), "Imports")
+        for route in top_routes:
+            inspector_df = data.iloc[routes.rows(route, bits)]
+            inspector_df['Citizenship'].value_counts()
+            inspector_df.groupby(['Origin_Club', 'Destination_Club']).size()
+
+    def network_edges():
+        bits = global_filter(fidx)
+        scopes = [
+            fidx.eq('Origin_League', 'Superliga') & fidx.eq('Destination_League', 'Superliga') & fidx.eq('Origin_Country', 'Romania'),
+            (fidx.eq('Origin_League', 'Superliga') & fidx.eq('Destination_League', 'Liga 2')) |
+            (fidx.eq('Origin_League', 'Liga 2') & fidx.eq('Destination_League', 'Superliga')),
+            fidx.eq('Origin_Country', 'Romania') & fidx.eq('Destination_Country', 'Romania'),
+        ]
+        for scope in scopes:
+            net_df = data.iloc[fidx.rows(bits & scope)]
+            edges = net_df.groupby(['Origin_Club', 'Destination_Club']).size().reset_index(name='Weight')
+            edges[edges['Weight'] >= 3]
+
+    rows = len(data)
+    return [
+        ("dashboard.load_data", lambda: dashboard_frame(apply_schema(pd.read_csv(table_file, low_memory=False))), len(raw)),
+        ("dashboard.derive_columns", lambda: derive_dashboard_columns(underived.copy()), rows),
+        ("dashboard.filter_index", lambda: FilterIndex(data), rows),
+        ("dashboard.route_index", lambda: RouteIndex(data), rows),
+        ("dashboard.flow_cube", lambda: build_flow_cube(data), rows),
+        ("dashboard.sankey_flows", sankey_flows, len(view_modes)),
+        ("dashboard.path_analyzer", path_analyzer, len(top_routes)),
+        ("dashboard.network_edges", network_edges, 3),
+    ]
+
+# --- BASELINE COMPARISON ---
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Prints current vs. baseline times and returns the names that regressed. Compares the
+    best-of-N (min) time: scheduler noise only ever adds time, so it's the stable statistic."""
+    if baseline.get('fixtures') != results.get('fixtures'):
+        print("⚠️ Fixtures differ from the baseline's; timings may not be comparable.")
+    if baseline.get('table') != results.get('table'):
+        print("⚠️ Table copy differs from the baseline's; timings may not be comparable.")
+    before = {b['name']: b for b in baseline['benchmarks']}
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline':>10} {'current':>10} {'change':>8}")
+    for b in results['benchmarks']:
+        old = before.get(b['name'])
+        if not old:
+            print(f"{b['name']:45} {'-':>10} {b['min_s'] * 1000:>8.1f}ms {'new':>8}")
+            continue
+        change = b['min_s'] / old['min_s'] - 1 if old['min_s'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(b['name'])
+            flag = " 🔴"
+        elif change < -threshold:
+            flag = " 🟢"
+        print(f"{b['name']:45} {old['min_s'] * 1000:>8.1f}ms {b['min_s'] * 1000:>8.1f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the parsers and dashboard transforms")
+    parser.add_argument("--table", default=TABLE_COPY, help="Frozen transfer_base_table copy to benchmark against")
+    parser.add_argument("--record", action="store_true", help="Refresh the HTML fixtures from the response cache")
+    parser.add_argument("--synthesize", action="store_true", help="Rebuild synthetic HTML fixtures from the table copy")
+    parser.add_argument("--parity", action="store_true", help="Only check that every parser backend matches bs4 on the fixtures")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Timed runs per benchmark (after one warm-up)")
+    parser.add_argument("--output", default=RESULTS_FILE, help="Where to write the JSON results")
+    parser.add_argument("--save-baseline", action="store_true", help="Also store the results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_FILE, help="Compare with a baseline (default: the stored one); exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Allowed slowdown (fraction) before --compare fails")
+    args = parser.parse_args()
+
+    table = apply_schema(pd.read_csv(args.table, low_memory=False))
+    if args.record and not record_fixtures(table):
+        sys.exit(1)
+    if args.synthesize or not os.path.exists(os.path.join(FIXTURE_DIR, FIXTURE_MANIFEST)):
+        if not args.synthesize:
+            print("⚠️ No recorded fixtures (run with --record after a cached scrape). Using synthetic pages.")
+        synthesize_fixtures(table)
+    manifest, bodies, fixture_digest = load_fixtures()
+    if not report_parity(manifest, bodies):
+        sys.exit(1)
+    if args.parity:
+        sys.exit(0)
+
+    cases = parser_benchmarks(manifest, bodies) + money_benchmarks(table) + dashboard_benchmarks(args.table)
+    if args.only:
+        cases = [c for c in cases if args.only in c[0]]
+
+    benchmarks = []
+    for name, fn, items in cases:
+        result = summarize(name, measure(fn, args.repeat), items)
+        benchmarks.append(result)
+        print(f"⏱️ {name:45} median {result['median_s'] * 1000:8.1f}ms  min {result['min_s'] * 1000:8.1f}ms  ({items} items)")
+    set_backend("auto")
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'machine': platform.machine(), 'platform': platform.platform(),
+        'table': file_digest(args.table), 'fixtures': fixture_digest, 'fixture_source': manifest['source'],
+        'benchmarks': benchmarks,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to '{args.output}'")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to '{BASELINE_FILE}'")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n🔴 {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%}.")
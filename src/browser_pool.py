@@ -0,0 +1,116 @@
+import logging
+import queue
+import random
+import threading
+import time
+from run_metrics import METRICS
+
+logger = logging.getLogger()
+
+class RateLimiter:
+    """Global limiter shared by every worker: at most `rate` page visits per second overall."""
+
+    def __init__(self, rate, jitter=0.2):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        if start > now:
+            METRICS.sleep(start - now)
+
+class BrowserPool:
+    """N worker threads, each owning its own driver, pulling from one shared work queue.
+
+    fetch(driver, task) does one page visit. A result for which is_failure(result) is true
+    (or an exception) is re-queued up to max_attempts times, preferring a worker that hasn't
+    failed it yet. run() yields (task, result) pairs as pages finish, so the calling thread
+    stays the only one touching the DataFrame."""
+
+    def __init__(self, size, init_driver, fetch, is_failure=lambda result: False, rate=2.0, max_attempts=3):
+        self.size = max(1, size)
+        self.init_driver = init_driver
+        self.fetch = fetch
+        self.is_failure = is_failure
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self._live = 0
+        self._live_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+
+    def run(self, tasks):
+        work, results = queue.Queue(), queue.Queue()
+        for task in tasks:
+            work.put((task, 0, frozenset()))
+
+        stop = threading.Event()
+        self._live = self.size
+        threads = [threading.Thread(target=self._worker, args=(wid, work, results, stop), daemon=True)
+                   for wid in range(self.size)]
+        for t in threads: t.start()
+
+        try:
+            delivered = 0
+            while delivered < len(tasks):
+                try:
+                    item = results.get(timeout=1.0)
+                except queue.Empty:
+                    if self._live == 0:
+                        raise RuntimeError("All browser workers died; see errors above.")
+                    continue
+                delivered += 1
+                yield item
+        finally:
+            stop.set()
+            for t in threads: t.join(timeout=30)
+
+    def _worker(self, wid, work, results, stop):
+        try:
+            # Drivers start one at a time: webdriver-manager's download/cache isn't thread-safe
+            with self._init_lock:
+                driver = self.init_driver()
+        except Exception as e:
+            logger.error(f"   ❌ Worker {wid}: driver failed to start: {e}")
+            with self._live_lock: self._live -= 1
+            return
+
+        try:
+            while not stop.is_set():
+                try:
+                    task, attempts, failed_on = work.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                # Hand a retry back if another live worker hasn't tried it yet
+                if wid in failed_on and len(failed_on) < self._live:
+                    work.put((task, attempts, failed_on))
+                    time.sleep(0.1)
+                    continue
+
+                self.limiter.wait()
+                try:
+                    result = self.fetch(driver, task)
+                    failed = self.is_failure(result)
+                except Exception as e:
+                    logger.error(f"   ❌ Worker {wid}: {e}")
+                    result, failed = None, True
+
+                if failed and attempts + 1 < self.max_attempts:
+                    logger.warning(f"   🔁 Worker {wid}: re-queueing {task} (attempt {attempts + 2}/{self.max_attempts})")
+                    METRICS.record_retry()
+                    work.put((task, attempts + 1, failed_on | {wid}))
+                    continue
+                results.put((task, result))
+        finally:
+            with self._live_lock: self._live -= 1
+            try: driver.quit()
+            except Exception: pass
+
+def add_pool_arguments(parser):
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel browser workers")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max page visits per second across all workers")
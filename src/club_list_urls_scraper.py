@@ -1,8 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
-import time
+import argparse
+from http_cache import add_cache_arguments, cache_from_args
+from html_parsing import club_links, add_parser_arguments, set_backend, parse_report
+from run_metrics import METRICS, http_get
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -30,67 +31,68 @@ LEAGUE_CONFIG = [
     ("Liga 2", "19/20", "https://www.transfermarkt.com/liga-2/startseite/wettbewerb/RO2/saison_id/2019"),
 ]
 
-def extract_clubs_from_table(league_name, season_label, url):
+def extract_clubs_from_table(league_name, season_label, url, cache=None):
     print(f"🔎 Scanning {league_name} {season_label}...")
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
+        if cache:
+            html, from_cache = cache.fetch(url, headers=HEADERS)
+        else:
+            response = http_get(url, headers=HEADERS)
+            response.raise_for_status()
+            html, from_cache = response.content, False
     except Exception as e:
         print(f"❌ Error: {e}")
         return []
 
-    soup = BeautifulSoup(response.content, 'html.parser')
-    table = soup.find('table', class_='items')
-    if not table: return []
-
     found_entries = []
-    rows = table.find_all('tr')
     
-    for row in rows:
-        # Find Club Link
-        link_tag = row.find('a', class_='vereinprofil_tooltip')
-        if not link_tag:
-            link_tag = row.find('a', href=re.compile(r'/verein/'))
+    # Each entry is the club link of one table.items row: /fcsb/startseite/verein/301
+    for href, title in club_links(html):
+        # 1. Get ID and Slug
+        id_match = re.search(r'/verein/(\d+)', href)
+        if not id_match: continue
+        club_id = id_match.group(1)
+        club_slug = href.strip('/').split('/')[0]
         
-        if link_tag:
-            href = link_tag['href'] # /fcsb/startseite/verein/301
-            
-            # 1. Get ID and Slug
-            id_match = re.search(r'/verein/(\d+)', href)
-            if not id_match: continue
-            club_id = id_match.group(1)
-            club_slug = href.strip('/').split('/')[0]
-            
-            # 2. Clean Name
-            # Use 'title' if available, else slug. Replace special chars for safety.
-            raw_name = link_tag.get('title', club_slug)
-            club_name = raw_name.replace('â', 'a').strip()
+        # 2. Clean Name
+        # Use 'title' if available, else slug. Replace special chars for safety.
+        raw_name = title if title is not None else club_slug
+        club_name = raw_name.replace('â', 'a').strip()
 
-            # 3. Build URL
-            transfer_url = f"https://www.transfermarkt.com/{club_slug}/alletransfers/verein/{club_id}"
+        # 3. Build URL
+        transfer_url = f"https://www.transfermarkt.com/{club_slug}/alletransfers/verein/{club_id}"
 
-            found_entries.append({
-                'Club_Name': club_name,
-                'Club_ID': club_id,
-                'Transfer_URL': transfer_url,
-                'League': league_name,
-                'Season': season_label
-            })
+        found_entries.append({
+            'Club_Name': club_name,
+            'Club_ID': club_id,
+            'Transfer_URL': transfer_url,
+            'League': league_name,
+            'Season': season_label
+        })
 
-    time.sleep(0.5)
+    if not from_cache: METRICS.sleep(0.5)
     return found_entries
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect club URLs and league history from the league tables")
+    add_cache_arguments(parser)
+    add_parser_arguments(parser)
+    args = parser.parse_args()
+    cache = cache_from_args(args)
+    set_backend(args.parser)
+    METRICS.start("club_list_urls")
+
     all_entries = []
     
     # 1. Scrape all configured seasons
     for league, season, url in LEAGUE_CONFIG:
-        entries = extract_clubs_from_table(league, season, url)
+        entries = extract_clubs_from_table(league, season, url, cache)
         all_entries.extend(entries)
     
-    # 2. Create the League History Map (Club + Season -> League)
+    # 2. Create the League History Map (Club ID + Season -> League; name kept for display)
     df_history = pd.DataFrame(all_entries)
-    df_history = df_history[['Club_Name', 'Season', 'League']].drop_duplicates()
+    df_history = df_history[['Club_ID', 'Club_Name', 'Season', 'League']].drop_duplicates()
+    METRICS.add_rows(len(df_history))
     df_history.to_csv("data/club_league_history.csv", index=False)
     print(f"✅ Generated League History: {len(df_history)} rows saved to 'data/club_league_history.csv'")
 
@@ -99,4 +101,5 @@ if __name__ == "__main__":
     # We only need one URL per club (deduplicate by ID)
     df_urls = df_urls[['Club_Name', 'Club_ID', 'Transfer_URL']].drop_duplicates(subset=['Club_ID'])
     df_urls.to_csv("data/club_urls_list.csv", index=False)
-    print(f"✅ Generated Scraping List: {len(df_urls)} unique clubs saved to 'data/club_urls_list.csv'")
\ No newline at end of file
+    print(f"✅ Generated Scraping List: {len(df_urls)} unique clubs saved to 'data/club_urls_list.csv'")
+    print(parse_report())
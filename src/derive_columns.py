@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard reads instead of computing them on every cold start
+DERIVED_COLUMNS = ['Age', 'UI_Type', 'Migration_Type', 'Origin_Label', 'Destination_Label']
+# League values the dashboard can't place on the map
+BAD_LEAGUES = ["TBD", "Unknown", "nan", "Retired", "Without Club", "Disqualification"]
+
+def has_derived_columns(df):
+    return all(col in df.columns for col in DERIVED_COLUMNS)
+
+def player_age(df):
+    """Season start year minus birth year; NaN when either can't be read.
+    Birth year is the last '/' part (d/m/Y) or the first '-' part (ISO)."""
+    dob = df['Date_of_Birth'].astype(str).fillna("")
+    slash_year = dob.str.rsplit('/', n=1).str[-1]
+    dash_year = dob.str.split('-', n=1).str[0]
+    year_str = np.where(dob.str.contains('/', regex=False), slash_year,
+                        np.where(dob.str.contains('-', regex=False), dash_year, None))
+    birth_year = pd.to_numeric(pd.Series(year_str, index=df.index), errors='coerce')
+    season_start = pd.to_numeric("20" + df['Season'].astype(str).str.split('/').str[0], errors='coerce')
+    age = season_start - birth_year
+    # Non-integer fragments (e.g. "2000.5") were never valid years
+    return age.where(birth_year % 1 == 0).astype('float64')
+
+def transfer_type(df):
+    t_type = df['Transfer_Type'].astype(str).fillna("").str.lower()
+    fee = pd.to_numeric(df['Fee_Est_M'], errors='coerce').fillna(0.0)
+    return pd.Series(np.select([t_type.str.contains('loan', regex=False), fee > 0], ['Loan', 'Fee'], 'Free'),
+                     index=df.index)
+
+def migration_type(df):
+    origin_ro = (df['Origin_Country'] == 'Romania').fillna(False).to_numpy(dtype=bool)
+    dest_ro = (df['Destination_Country'] == 'Romania').fillna(False).to_numpy(dtype=bool)
+    is_national = df['Citizenship'].astype(str).fillna("").str.strip().str.contains('Romania', regex=False).to_numpy(dtype=bool)
+    return pd.Series(np.select(
+        [origin_ro & dest_ro, origin_ro & ~dest_ro, ~origin_ro & dest_ro & is_national, ~origin_ro & dest_ro],
+        ["Domestic Move", "Export (Out)", "Repatriation (Return)", "Foreign Import"],
+        "External"), index=df.index)
+
+def derive_dashboard_columns(df):
+    """Adds the dashboard's derived columns in place (vectorized) and returns df."""
+    for col in ['Date_of_Birth', 'Citizenship', 'Origin_Country', 'Destination_Country']:
+        if col not in df.columns: df[col] = None
+    # As object: a column that is all None (no countries before refine runs) doesn't add to str
+    df['Origin_Label'] = df['Origin_Country'].astype(object) + ": " + df['Origin_League'].astype(object)
+    df['Destination_Label'] = df['Destination_Country'].astype(object) + ": " + df['Destination_League'].astype(object)
+    df['Age'] = player_age(df)
+    df['UI_Type'] = transfer_type(df)
+    df['Migration_Type'] = migration_type(df)
+    return df
+
+def dashboard_frame(df):
+    """The rows the dashboard shows (both leagues and countries known), fees as floats,
+    derived columns present. Only a table written before save_table() materialized them
+    needs deriving here."""
+    mask = (
+        (~df['Origin_League'].isin(BAD_LEAGUES)) &
+        (~df['Destination_League'].isin(BAD_LEAGUES)) &
+        (df['Origin_League'].notna()) &
+        (df['Destination_League'].notna()) &
+        (df['Origin_Country'].notna()) &
+        (df['Destination_Country'].notna())
+    )
+    data = df[mask].copy()
+    data['Fee_Est_M'] = pd.to_numeric(data['Fee_Est_M'], errors='coerce').fillna(0.0)
+    if not has_derived_columns(data):
+        derive_dashboard_columns(data)
+    return data
@@ -1,21 +1,21 @@
-import pandas as pd
-import time
-import random
 import re
 import os
 import logging
 import sys
+import argparse
 import requests
 from bs4 import BeautifulSoup
 from difflib import SequenceMatcher
+from enrichment_journal import EnrichmentJournal
+from work_db import WorkDB
+from browser_pool import BrowserPool, add_pool_arguments
+from hybrid_fetch import HybridFetcher, add_fetch_arguments
+from run_metrics import METRICS
 
 # --- SELENIUM IMPORTS ---
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 # --- LOGGING ---
@@ -23,7 +23,9 @@ logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.
 logger = logging.getLogger()
 
 # --- CONSTANTS ---
-DATA_FILE = "data/processed/transfer_base_table.csv"
+COMPACT_EVERY = 25  # players between commits to the working database (each one only touches their rows)
+# On every loaded transfers page, even with no transfers (the grid heading row)
+PLAYER_READY_CLASS = "tm-player-transfer-history-grid"
 
 # --- BROWSER SETUP ---
 def init_driver():
@@ -65,30 +67,33 @@ def normalize_name(name):
         n = n.replace(word, "")
     return n.strip()
 
-# --- PHASE 1: PLAYER SCRAPER (SELENIUM) ---
-def get_player_data_selenium(driver, player_id, player_name):
+# --- PHASE 1: PLAYER SCRAPER (HTTP FIRST, SELENIUM FALLBACK) ---
+def get_player_data(fetcher, player_id, player_name):
+    """(dob, citizenship, history, current_mv), or None when the page never loaded
+    (fetch error, challenge page, or no transfer grid at all)."""
     url = f"https://www.transfermarkt.com/player/transfers/spieler/{player_id}"
     
     print(f"\n────────────────────────────────────────────────────────")
     logger.info(f"👤 Visiting: {player_name} (ID: {player_id})")
     
     try:
-        driver.get(url)
-        if "Challenge" in driver.title or "Cloudflare" in driver.title:
-            logger.warning("   🛑 ACCESS BLOCKED: Cloudflare Challenge.")
-            return None, None, [], 0.0
-            
-        try:
-            WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.CLASS_NAME, "tm-player-transfer-history-grid")))
-        except: 
-            logger.warning("   ⚠️ Transfer grid not found (New/Empty profile?).")
-
-        html = driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-
+        html = fetcher.get(url, ready_class=PLAYER_READY_CLASS)
     except Exception as e:
         logger.error(f"   ❌ Browser Error: {e}")
-        return None, None, [], 0.0
+        return None
+    if html is None:
+        return None
+    if PLAYER_READY_CLASS not in html:
+        logger.warning(f"   ⚠️ No transfer history grid on the page.")
+        return None
+    with METRICS.parsing("player page"):
+        return parse_player_page(html)
+
+def get_player_data_selenium(driver, player_id, player_name):
+    return get_player_data(HybridFetcher(driver=driver, browser_only=True), player_id, player_name)
+
+def parse_player_page(html):
+    soup = BeautifulSoup(html, 'html.parser')
 
     dob, citizenship, current_mv = None, None, 0.0
 
@@ -189,25 +194,126 @@ def get_player_data_selenium(driver, player_id, player_name):
         except: continue
     
     logger.info(f"   📜 History Rows: {len(history_data)}")
-    time.sleep(random.uniform(0.8, 1.2))
+    # Pacing between visits is handled by the BrowserPool's shared rate limiter
     return dob, citizenship, history_data, current_mv
 
+# --- PLAYER INDEX ---
+class PlayerIndex:
+    """TM_Player_ID -> row positions, built once so per-player lookups don't scan the frame.
+    Updates are buffered per column (keyed by the database Transfer_Key) and flush() commits
+    them, plus the player bios, to the working database in one transaction."""
+
+    def __init__(self, df, db):
+        self.db = db
+        self.positions = df.groupby('TM_Player_ID', sort=False).indices
+        self.keys = df['Transfer_Key'].to_numpy()
+        self.seasons = df['Season'].to_numpy()
+        self.origin_clubs = df['Origin_Club'].to_numpy()
+        self.pending = {}  # column -> {Transfer_Key: value}
+        self.bios = []  # (pid, dob, citizenship) for the players table
+
+    def rows(self, pid):
+        return self.positions.get(pid, ())
+
+    def set(self, col, positions, value):
+        bucket = self.pending.setdefault(col, {})
+        for pos in positions: bucket[self.keys[pos]] = value
+
+    def set_bio(self, pid, dob, cit):
+        positions = self.rows(pid)
+        if dob: self.set('Date_of_Birth', positions, dob)
+        if cit: self.set('Citizenship', positions, cit)
+        if dob or cit: self.bios.append((pid, dob or None, cit or None))
+
+    def flush(self):
+        if self.pending or self.bios:
+            self.db.update_cells(self.pending, self.bios)
+        self.pending = {}
+        self.bios = []
+
+# --- APPLY RESULTS ---
+def apply_player_result(index, pid, dob, cit, history, current_mv):
+    positions = index.rows(pid)
+
+    # 1. Update Bio
+    index.set_bio(pid, dob, cit)
+
+    # 2. Update Market Values
+    if history:
+        for pos in positions:
+            target_season = index.seasons[pos]
+            csv_norm = normalize_name(index.origin_clubs[pos])
+            
+            candidates = [h for h in history if h['Season'] == target_season]
+            match = None
+            
+            if len(candidates) == 1:
+                match = candidates[0]
+            elif len(candidates) > 1:
+                for cand in candidates:
+                    if (cand['Old_Club_Norm'] in csv_norm) or (csv_norm in cand['Old_Club_Norm']):
+                        match = cand
+                        break
+                if not match: match = candidates[-1]
+            
+            if match:
+                index.set('Market_Value_At_Transfer', [pos], match['Market_Value'])
+                logger.info(f"      ✅ Matched MV: €{match['Market_Value']}m ({target_season})")
+
+                target_year = match['Season_Year']
+                future_entries = [h for h in history if h['Season_Year'] > target_year]
+                
+                if future_entries:
+                    next_val = future_entries[-1]['Market_Value']
+                    index.set('Market_Value_Next_Season', [pos], next_val)
+                    logger.info(f"      📈 Next Transfer MV: €{next_val}m")
+                else:
+                    if current_mv > 0:
+                        index.set('Market_Value_Next_Season', [pos], current_mv)
+                        logger.info(f"      🔮 Current MV used as Exit: €{current_mv}m")
+
+def save(index, journal):
+    index.flush()
+    journal.compact()
+
+def replay_journal(index, journal):
+    replayed = 0
+    for rec in journal.records():
+        try:
+            apply_player_result(index, rec['pid'], rec['dob'], rec['citizenship'], rec['history'], rec['current_mv'])
+            replayed += 1
+        except Exception as e:
+            logger.error(f"   ⚠️ Could not replay player {rec.get('pid')}: {e}")
+    if replayed:
+        logger.info(f"⏯️ Replayed {replayed} journaled players from an interrupted run.")
+        save(index, journal)
+
 # --- MAIN ---
-def main():
-    if not os.path.exists(DATA_FILE):
-        print(f"❌ Error: {DATA_FILE} not found.")
-        return
+def init_fetcher(browser_only=False):
+    return HybridFetcher(init_browser=init_driver, browser_only=browser_only)
 
-    df = pd.read_csv(DATA_FILE, low_memory=False)
-    
-    new_cols = ['Date_of_Birth', 'Citizenship', 'Market_Value_At_Transfer', 'Market_Value_Next_Season', 
-                'Origin_Country', 'Destination_Country']
-    for col in new_cols:
-        if col not in df.columns: df[col] = None
+def player_page_failed(result):
+    # A loaded page is a success even with no bio or no transfers: retrying can't add any
+    return result is None
 
-    text_cols = ['Origin_Country', 'Destination_Country', 'Date_of_Birth', 'Citizenship', 'Origin_League', 'Destination_League']
-    for col in text_cols:
-        if col in df.columns: df[col] = df[col].astype("object")
+def main():
+    parser = argparse.ArgumentParser(description="Enrich transfer_base_table.csv with player bio and market values")
+    add_pool_arguments(parser)
+    add_fetch_arguments(parser)
+    args = parser.parse_args()
+    METRICS.start("enrich_players")
+
+    db = WorkDB()
+    try:
+        enrich(db, args)
+    finally:
+        db.close()
+
+def enrich(db, args):
+    df = db.transfers_frame(with_key=True)
+    if df.empty:
+        print("❌ Error: no transfers in the working database. Run the scraper first.")
+        return
 
     print("\n--- ENRICHMENT MENU ---")
     print("1. Enrich Players (Selenium)")
@@ -215,6 +321,13 @@ def main():
     choice = input("Select [1/2]: ").strip()
 
     if choice == '1':
+        # Fold in whatever a crashed run left behind before deciding what's still missing
+        journal = EnrichmentJournal()
+        replay_journal(PlayerIndex(df, db), journal)
+        # The replay only wrote to the database: re-read it so replayed players aren't scraped again
+        df = db.transfers_frame(with_key=True)
+        index = PlayerIndex(df, db)
+
         valid_id_mask = (df['TM_Player_ID'].notna()) & (df['TM_Player_ID'] != 0)
         # Aggressive Mask: If ANY key data is missing, re-process
         mask = (df['Date_of_Birth'].isna()) | \
@@ -224,69 +337,37 @@ def main():
                
         players_to_process = df.loc[mask & valid_id_mask, ['TM_Player_ID', 'Player_Name']].drop_duplicates(subset='TM_Player_ID')
         
-        print(f"🚀 Processing {len(players_to_process)} players...")
-        driver = init_driver()
+        tasks = [(int(pid), name) for pid, name in players_to_process.itertuples(index=False)]
+        print(f"🚀 Processing {len(tasks)} players with {args.workers} browser workers...")
+        pool = BrowserPool(args.workers, lambda: init_fetcher(args.browser_only),
+                           lambda fetcher, task: get_player_data(fetcher, *task),
+                           is_failure=player_page_failed, rate=args.rate)
 
         try:
-            for idx, row in players_to_process.iterrows():
+            for (pid, name), result in pool.run(tasks):
                 try:
-                    pid = int(row['TM_Player_ID'])
-                    name = row['Player_Name']
-                    
-                    dob, cit, history, current_mv = get_player_data_selenium(driver, pid, name)
-                    
-                    # 1. Update Bio
-                    if dob: df.loc[df['TM_Player_ID'] == pid, 'Date_of_Birth'] = dob
-                    if cit: df.loc[df['TM_Player_ID'] == pid, 'Citizenship'] = cit
-
-                    # 2. Update Market Values
-                    if history:
-                        player_rows = df[df['TM_Player_ID'] == pid]
-                        for r_idx, csv_row in player_rows.iterrows():
-                            target_season = csv_row['Season']
-                            csv_norm = normalize_name(csv_row['Origin_Club'])
-                            
-                            candidates = [h for h in history if h['Season'] == target_season]
-                            match = None
-                            
-                            if len(candidates) == 1:
-                                match = candidates[0]
-                            elif len(candidates) > 1:
-                                for cand in candidates:
-                                    if (cand['Old_Club_Norm'] in csv_norm) or (csv_norm in cand['Old_Club_Norm']):
-                                        match = cand
-                                        break
-                                if not match: match = candidates[-1]
-                            
-                            if match:
-                                df.at[r_idx, 'Market_Value_At_Transfer'] = match['Market_Value']
-                                logger.info(f"      ✅ Matched MV: €{match['Market_Value']}m ({target_season})")
-
-                                target_year = match['Season_Year']
-                                future_entries = [h for h in history if h['Season_Year'] > target_year]
-                                
-                                if future_entries:
-                                    next_val = future_entries[-1]['Market_Value']
-                                    df.at[r_idx, 'Market_Value_Next_Season'] = next_val
-                                    logger.info(f"      📈 Next Transfer MV: €{next_val}m")
-                                else:
-                                    if current_mv > 0:
-                                        df.at[r_idx, 'Market_Value_Next_Season'] = current_mv
-                                        logger.info(f"      🔮 Current MV used as Exit: €{current_mv}m")
+                    dob, cit, history, current_mv = result or (None, None, [], 0.0)
+                    # Journal first: once the line is on disk the result survives a crash
+                    journal.append(pid, dob, cit, history, current_mv)
+                    apply_player_result(index, pid, dob, cit, history, current_mv)
+                    if not player_page_failed(result):
+                        METRICS.add_rows(len(index.rows(pid)))
 
                 except Exception as e:
-                    logger.error(f"   ⚠️ Error processing {row.get('Player_Name', 'Unknown')}: {e}")
+                    logger.error(f"   ⚠️ Error processing {name}: {e}")
                     continue
 
-                # Save every row to verify immediately
-                df.to_csv(DATA_FILE, index=False)
+                if journal.pending >= COMPACT_EVERY:
+                    save(index, journal)
         
         except KeyboardInterrupt:
             print("\n🛑 Interrupted. Saving...")
         finally:
-            driver.quit()
-            df.to_csv(DATA_FILE, index=False)
-            print("👋 Browser Closed & Data Saved.")
+            # pool.run's cleanup has already stopped the workers and quit their browsers
+            save(index, journal)
+            journal.close()
+            db.export()
+            print("👋 Browsers Closed & Data Saved.")
     
     elif choice == '2':
         pass
@@ -0,0 +1,44 @@
+import json
+import os
+from table_store import TABLE_DIR
+
+# --- CONFIG ---
+JOURNAL_FILE = f"{TABLE_DIR}/enrichment_journal.jsonl"
+
+class EnrichmentJournal:
+    """Append-only JSONL log of raw per-player scrape results.
+
+    Every result is flushed and fsync'd before the next player starts, so a crash loses
+    at most the player in flight. compact() truncates it once the caller has committed
+    the results to the working database. Replaying is idempotent: a crash between the
+    commit and the truncate just re-applies the same values."""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.pending = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, player_id, dob, citizenship, history, current_mv):
+        record = {'pid': player_id, 'dob': dob, 'citizenship': citizenship,
+                  'history': history, 'current_mv': current_mv}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.pending += 1
+
+    def records(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+
+    def compact(self):
+        self._file.truncate(0)
+        self._file.seek(0)
+        self.pending = 0
+
+    def close(self):
+        self._file.close()
@@ -1,96 +1,91 @@
 import pandas as pd
 import os
+import argparse
+from table_store import load_table, iter_table_chunks, table_path, table_output
 
 # --- CONFIG ---
-INPUT_FILE = "data/processed/transfer_base_table.csv"
-OUTPUT_FILE = "data/manual_review_list.csv"
+OUTPUT_FILE = table_output("data/manual_review_list.csv")
 
-def main():
-    if not os.path.exists(INPUT_FILE):
-        print(f"❌ Error: {INPUT_FILE} not found.")
-        return
+BAD_VALUES = ["TBD", "Unknown", "nan"]
+# 0 = Null, 75 = Unknown, 515 = Without Club, 123 = Retired
+IGNORED_IDS = [0, 75, 515, 123]
+SIDES = ['Origin', 'Destination']
+# Orders all origin rows before all destination rows when picking the first name seen
+SIDE_OFFSET = 10 ** 12
 
-    df = pd.read_csv(INPUT_FILE, low_memory=False)
-    
-    # Dictionary to store unique missing contexts
-    missing_map = {}
-    
-    bad_values = ["TBD", "Unknown", "nan"]
+def missing_contexts(chunk, row_offset=0):
+    """Partial aggregate for one block of rows: (Club_ID, Season) -> first name/country seen + count."""
+    parts = []
+    for side_no, side in enumerate(SIDES):
+        league = chunk[f'{side}_League']
+        bad = league.isna() | league.astype(str).isin(BAD_VALUES) | (league.astype(str).str.strip() == "")
+        cid = pd.to_numeric(chunk[f'{side}_Club_ID'], errors='coerce')
+        keep = bad & cid.notna() & ~cid.isin(IGNORED_IDS)
+        parts.append(pd.DataFrame({
+            'Club_ID': cid[keep].astype('int64'),
+            'Club_Name': chunk.loc[keep, f'{side}_Club'],
+            'Season': chunk.loc[keep, 'Season'],
+            'Existing_Country': chunk.loc[keep, f'{side}_Country'] if f'{side}_Country' in chunk else None,
+            'First_Pos': side_no * SIDE_OFFSET + row_offset + keep.to_numpy().nonzero()[0],
+        }))
+    return first_per_context(pd.concat(parts, ignore_index=True), counts=None)
 
-    def is_bad(val):
-        return pd.isna(val) or str(val) in bad_values or str(val).strip() == ""
+def first_per_context(frame, counts='Occurrences'):
+    """Collapses to one row per (Club_ID, Season): name/country from the earliest row
+    (NaN included, unlike groupby.first) and the summed occurrences."""
+    frame = frame.sort_values('First_Pos', kind='stable')
+    keys = ['Club_ID', 'Season']
+    grouped = frame.groupby(keys, sort=False, dropna=False)
+    total = grouped.size() if counts is None else grouped[counts].sum()
+    firsts = frame.drop_duplicates(subset=keys).drop(columns=[counts] if counts else [])
+    firsts['Occurrences'] = total.to_numpy()  # same first-appearance order as drop_duplicates
+    return firsts.reset_index(drop=True)
 
-    print("🔍 Scanning for remaining TBDs...")
-    
-    # --- 1. SCAN ORIGIN ---
-    for _, row in df.iterrows():
-        if is_bad(row['Origin_League']):
-            try:
-                # Handle potential float/NaN IDs safely
-                cid_raw = row['Origin_Club_ID']
-                if pd.isna(cid_raw): continue
-                cid = int(cid_raw)
-                
-                # Filter ignored IDs
-                if cid in [0, 75, 515, 123]: continue 
-                
-                key = (cid, row['Season'])
-                if key not in missing_map:
-                    missing_map[key] = {
-                        'Club_ID': cid,  # Store explicitly here
-                        'Club_Name': row['Origin_Club'],
-                        'Season': row['Season'],
-                        'Existing_Country': row['Origin_Country'],
-                        'Occurrences': 0
-                    }
-                missing_map[key]['Occurrences'] += 1
-            except: pass
+def combine(partials):
+    if not partials:  # an empty table streams no chunks
+        return pd.DataFrame(columns=['Club_ID', 'Club_Name', 'Season', 'Existing_Country', 'First_Pos', 'Occurrences'])
+    return first_per_context(pd.concat(partials, ignore_index=True))
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the manual review list of clubs still missing a league")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input and output this many rows at a time (bounded memory)")
+    args = parser.parse_args()
 
-    # --- 2. SCAN DESTINATION ---
-    for _, row in df.iterrows():
-        if is_bad(row['Destination_League']):
-            try:
-                cid_raw = row['Destination_Club_ID']
-                if pd.isna(cid_raw): continue
-                cid = int(cid_raw)
-                
-                if cid in [0, 75, 515, 123]: continue
+    if not os.path.exists(table_path()):
+        print(f"❌ Error: {table_path()} not found.")
+        return
+
+    print("🔍 Scanning for remaining TBDs...")
 
-                key = (cid, row['Season'])
-                if key not in missing_map:
-                    missing_map[key] = {
-                        'Club_ID': cid,  # Store explicitly here
-                        'Club_Name': row['Destination_Club'],
-                        'Season': row['Season'],
-                        'Existing_Country': row['Destination_Country'],
-                        'Occurrences': 0
-                    }
-                missing_map[key]['Occurrences'] += 1
-            except: pass
+    # --- 1. PARTIAL AGGREGATES (ONE PER CHUNK) ---
+    if args.chunksize:
+        partials, offset = [], 0
+        for chunk in iter_table_chunks(args.chunksize):
+            partials.append(missing_contexts(chunk, offset))
+            offset += len(chunk)
+        review_df = combine(partials)
+    else:
+        review_df = missing_contexts(load_table())
 
-    # --- 3. SAFE DATAFRAME CREATION ---
-    if not missing_map:
+    if review_df.empty:
         print("✅ No TBD values found! Your data is already clean.")
         return
 
-    # Convert dictionary values directly to a list (Flattens the structure)
-    data_list = list(missing_map.values())
-    review_df = pd.DataFrame(data_list)
-    
-    # Define column order
+    # --- 2. REVIEW LIST ---
     cols = ['Club_ID', 'Club_Name', 'Season', 'Existing_Country', 'Occurrences']
     review_df = review_df[cols]
-    
+
     # Add empty column for your manual input
     review_df['New_League'] = ""
-    
+
     # Sort by Occurrences (Fix the biggest impact items first!)
-    review_df = review_df.sort_values(by='Occurrences', ascending=False)
+    review_df = review_df.sort_values(by='Occurrences', ascending=False, kind='stable')
 
     print(f"\n📊 Found {len(review_df)} unique contexts to review.")
     print(f"💾 Saving to {OUTPUT_FILE}...")
-    review_df.to_csv(OUTPUT_FILE, index=False)
+    review_df.to_csv(OUTPUT_FILE, index=False, chunksize=args.chunksize)
     print("✅ Done. Open the CSV in Excel, fill 'New_League', and save.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Categorical columns that get one bitmap per distinct value
+BITMAP_COLUMNS = ['Season', 'UI_Type', 'Migration_Type', 'Origin_Country', 'Destination_Country',
+                  'Origin_League', 'Destination_League']
+
+class FilterIndex:
+    """Packed per-value bitmaps over a loaded frame, built once per data load.
+
+    Each bitmap is a np.packbits array (one bit per row), so combining filters is a
+    bitwise AND/OR over n/8 bytes and no intermediate DataFrame is created. rows()
+    turns the final bitmap into row positions for a single df.iloc take. Plain `~` is a
+    safe NOT: the padding bits past row n are ignored by rows() and count()."""
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.bitmaps = {}
+        for col in BITMAP_COLUMNS:
+            if col not in df.columns: continue
+            codes, uniques = pd.factorize(df[col])
+            self.bitmaps[col] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+
+        # Age buckets: one bitmap per whole year; NaN ages never match a range (as before)
+        ages = pd.to_numeric(df['Age'], errors='coerce').to_numpy()
+        self.age_bitmaps = {int(age): np.packbits(ages == age) for age in np.unique(ages[~np.isnan(ages)])}
+
+        # Fees sorted once so "fee >= x" is a searchsorted plus one scatter
+        fees = pd.to_numeric(df['Fee_Est_M'], errors='coerce').fillna(0.0).to_numpy()
+        self._fee_order = np.argsort(fees, kind='stable')
+        self._fees_sorted = fees[self._fee_order]
+
+        self.cross_league = np.packbits((df['Origin_League'] != df['Destination_League']).to_numpy(dtype=bool))
+
+    def all_rows(self):
+        return np.packbits(np.ones(self.n, dtype=bool))
+
+    def no_rows(self):
+        return np.packbits(np.zeros(self.n, dtype=bool))
+
+    def eq(self, col, value):
+        return self.bitmaps[col].get(value, self.no_rows())
+
+    def isin(self, col, values):
+        result = self.no_rows()
+        for value in values:
+            if value in self.bitmaps[col]:
+                result = result | self.bitmaps[col][value]
+        return result
+
+    def age_between(self, low, high):
+        result = self.no_rows()
+        for age, bitmap in self.age_bitmaps.items():
+            if low <= age <= high:
+                result = result | bitmap
+        return result
+
+    def fee_at_least(self, min_fee):
+        hits = np.zeros(self.n, dtype=bool)
+        hits[self._fee_order[np.searchsorted(self._fees_sorted, min_fee, side='left'):]] = True
+        return np.packbits(hits)
+
+    def rows(self, bitmap):
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n))
+
+    def count(self, bitmap):
+        return int(np.unpackbits(bitmap, count=self.n).sum())
+
+class RouteIndex:
+    """Row positions per (Origin_Label, Destination_Label) route, built once per data load.
+
+    Keys are label tuples, so a label containing ' ➔ ' or ' (' can't be mis-split.
+    rows() tests only the route's own bits in a FilterIndex bitmap, so inspecting a
+    route costs O(route size), not a scan of the filtered table."""
+
+    def __init__(self, df):
+        self._positions = df.groupby(['Origin_Label', 'Destination_Label'], sort=False).indices
+
+    def rows(self, route, bitmap=None):
+        positions = self._positions.get(tuple(route), np.empty(0, dtype=np.int64))
+        if bitmap is None: return positions
+        # np.packbits is big-endian: row i is bit (7 - i % 8) of byte i // 8
+        keep = (bitmap[positions >> 3] >> (7 - (positions & 7))) & 1
+        return positions[keep.astype(bool)]
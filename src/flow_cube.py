@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+# Every column a Sankey filter can touch. Countries/leagues are implied by the labels,
+# so carrying them adds no extra cells; they let the same FilterIndex run on the cube.
+CUBE_DIMS = ['Season', 'UI_Type', 'Age', 'Migration_Type',
+             'Origin_Country', 'Origin_League', 'Destination_Country', 'Destination_League',
+             'Origin_Label', 'Destination_Label', 'Fee_Est_M']
+
+def build_flow_cube(df):
+    """Collapses transfers into one row per distinct combination of CUBE_DIMS with a
+    Count and a Fee_Sum. Fee_Est_M is kept as a dimension only for 'Fee' rows (the only
+    ones the min-fee filter looks at) and zeroed elsewhere, which keeps the cube small."""
+    keyed = df[CUBE_DIMS[:-1]].copy()
+    fees = pd.to_numeric(df['Fee_Est_M'], errors='coerce').fillna(0.0)
+    keyed['Fee_Est_M'] = np.where(df['UI_Type'] == 'Fee', fees, 0.0)
+    keyed['Fee_Sum'] = fees
+    cube = keyed.groupby(CUBE_DIMS, dropna=False, sort=False).agg(
+        Count=('Fee_Sum', 'size'),
+        Fee_Sum=('Fee_Sum', 'sum'),
+    )
+    return cube.reset_index()
+
+def roll_up_flows(cube_rows, min_flow):
+    """Origin_Label -> Destination_Label flows from the selected cube rows."""
+    flows = cube_rows.groupby(['Origin_Label', 'Destination_Label'])[['Count', 'Fee_Sum']].sum().reset_index()
+    return flows[flows['Count'] >= min_flow]
@@ -0,0 +1,319 @@
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import re
+import time
+from table_store import apply_schema, to_arrow, pa, pq
+from derive_columns import derive_dashboard_columns
+from work_db import BASE_COLUMNS, TRANSFER_KEY
+
+# --- CONFIG ---
+OUTPUT_ROOT = "data/synthetic"
+SEED = 42
+LAST_SEASON_START = 2025  # 25/26
+SEASON_COUNT = 7          # 19/20 .. 25/26, like the scraped table
+LEAGUE_COUNT = 40
+CHUNK_ROWS = 1_000_000
+
+# Shape of the scraped table (see data/raw/transfer_base_table_copy_2.csv)
+MEAN_MOVES = 2.7                   # transfers per player
+SEASON_STEP = ([0, 1, 2], [0.3, 0.55, 0.15])  # seasons between a player's moves
+HOME_START_SHARE = 0.6             # careers that start at a home-country club
+DOMESTIC_SHARE = 0.75              # moves that stay in the player's current country
+HOME_PULL = 0.3                    # moves abroad from a foreign club that land in the home country
+TYPE_SHARES = {"Loan": 0.2, "Free Transfer": 0.57, "Permanent": 0.23}
+END_OF_LOAN_SHARE = 0.2            # loan rows recorded as the return leg
+UNRESOLVED_SHARE = 0.1             # foreign sides the pipeline couldn't place (league TBD, no country)
+MISSING_CLUB_ID = 0.01
+MISSING_DOB = 0.005
+MISSING_CITIZENSHIP = 0.003
+DUAL_CITIZENSHIP = 0.05
+
+HOME_COUNTRY = "Romania"
+# (league, clubs, strength); the dashboard colours these three by name
+HOME_LEAGUES = [("Superliga", 16, 1.0), ("Liga 2", 22, 0.35), ("Youth/Reserve", 40, 0.1)]
+COUNTRIES = [
+    "England", "Spain", "Germany", "Italy", "France", "Portugal", "Netherlands", "Belgium", "Turkey", "Greece",
+    "Austria", "Switzerland", "Scotland", "Denmark", "Czech Republic", "Poland", "Croatia", "Serbia", "Ukraine",
+    "Hungary", "Bulgaria", "Cyprus", "Israel", "Slovakia", "Slovenia", "Sweden", "Norway", "Moldova",
+    "Bosnia-Herzegovina", "North Macedonia", "Albania", "Kazakhstan", "Azerbaijan", "Georgia", "Armenia",
+    "Lithuania", "Latvia", "Estonia", "Finland", "Iceland", "Ireland", "Wales", "Montenegro", "Kosovo",
+    "Brazil", "Argentina", "Uruguay", "Colombia", "Nigeria", "Senegal", "Ghana", "Ivory Coast", "Cameroon",
+    "Morocco", "Tunisia", "Algeria", "Japan", "South Korea", "China", "Saudi Arabia", "Qatar", "United States",
+]
+FIRST_NAMES = [
+    "Andrei", "Alexandru", "Mihai", "Ionut", "Florin", "Cristian", "Gabriel", "Razvan", "Vlad", "Stefan",
+    "Luca", "Marco", "Diego", "Joao", "Pedro", "Lucas", "Mateus", "Ivan", "Marko", "Luka", "Petar", "Nikola",
+    "Tomas", "Jan", "David", "Daniel", "Adrian", "Bogdan", "Dragos", "Ousmane", "Moussa", "Ibrahima", "Kwame",
+    "Samuel", "Yuki", "Ahmed", "Karim", "Leo", "Hugo", "Erik",
+]
+SYLLABLES = ["ba", "ca", "do", "le", "mi", "nu", "po", "ra", "si", "tu", "va", "zo", "gre", "sto", "vic",
+             "lan", "mar", "ses", "cov", "dan", "tin", "rel", "bor", "gul", "nes", "scu", "vski", "ic", "ez", "os"]
+CLUB_FORMS = ["FC", "CS", "AFC", "SC", "FK", "Sportul", "Athletic", "United", "Unirea", "Dinamo", "Olimpia"]
+
+def seasons(count=SEASON_COUNT, last_start=LAST_SEASON_START):
+    return [f"{y % 100:02d}/{(y + 1) % 100:02d}" for y in range(last_start - count + 1, last_start + 1)]
+
+def parse_count(text):
+    """'250000', '250k' or '10m' -> int."""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmM]?)\s*', str(text))
+    if not match: raise argparse.ArgumentTypeError(f"not a row count: {text}")
+    return int(float(match.group(1)) * {"": 1, "k": 1_000, "m": 1_000_000}[match.group(2).lower()])
+
+def count_label(rows):
+    if rows % 1_000_000 == 0: return f"{rows // 1_000_000}m"
+    if rows % 1_000 == 0: return f"{rows // 1_000}k"
+    return str(rows)
+
+def make_words(rng, n, parts=(2, 3)):
+    """n made-up words of parts[0]..parts[1] syllables (vectorized: millions of players)."""
+    counts = rng.integers(parts[0], parts[1] + 1, n)
+    picks = np.array(SYLLABLES, dtype=object)[rng.integers(0, len(SYLLABLES), (n, parts[1]))]
+    words = pd.Series(picks[:, 0], dtype=object)
+    for j in range(1, parts[1]):
+        words = words + np.where(counts > j, picks[:, j], "")
+    return words.str.capitalize().to_numpy(dtype=object)
+
+# --- WORLD (leagues and clubs) ---
+class World:
+    """Clubs sorted by country, with per-club league, strength and popularity. Popularity is
+    how often a club shows up in moves; strength scales fees and market values."""
+
+    def __init__(self, rng, league_count=LEAGUE_COUNT):
+        leagues = [(HOME_COUNTRY, name, n, strength) for name, n, strength in HOME_LEAGUES]
+        # Country strength falls off with rank; extra leagues go one tier down, round-robin
+        tier = 1
+        while len(leagues) < league_count:
+            for rank, country in enumerate(COUNTRIES):
+                if len(leagues) >= league_count: break
+                strength = 2.5 / np.sqrt(rank + 1) / tier
+                leagues.append((country, f"{country} Division {tier}", int(rng.integers(14, 23)), strength))
+            tier += 1
+        leagues = sorted(leagues, key=lambda l: l[0])
+
+        rows = [(country, league, strength) for country, league, n, strength in leagues for _ in range(n)]
+        self.country = np.array([r[0] for r in rows], dtype=object)
+        self.league = np.array([r[1] for r in rows], dtype=object)
+        self.strength = np.array([r[2] for r in rows])
+        n_clubs = len(rows)
+        self.popularity = rng.lognormal(0.0, 0.6, n_clubs)
+        self.club_id = rng.permutation(np.arange(1, n_clubs * 20 + 1))[:n_clubs]
+        cities = make_words(rng, n_clubs)
+        forms = rng.choice(CLUB_FORMS, n_clubs)
+        self.name = (pd.Series(forms, dtype=object) + " " + cities).to_numpy(dtype=object, copy=True)
+        # Names must be unique: the dashboard's network groups by club name
+        seen = {}
+        for i, name in enumerate(self.name):
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1: self.name[i] = f"{name} {seen[name]}"
+
+        # Sampling tables: global popularity CDF, and per-country CDFs laid end to end as
+        # country_index + cdf so one searchsorted serves every country at once
+        self.countries, self.country_idx = np.unique(self.country, return_inverse=True)
+        self.cdf = np.cumsum(self.popularity) / self.popularity.sum()
+        within = np.zeros(n_clubs)
+        for c in range(len(self.countries)):
+            members = self.country_idx == c
+            within[members] = np.cumsum(self.popularity[members]) / self.popularity[members].sum()
+        self.country_cdf = self.country_idx + within
+        self.home = np.flatnonzero(self.country == HOME_COUNTRY)
+        self.home_cdf = np.cumsum(self.popularity[self.home]) / self.popularity[self.home].sum()
+        self.leagues = len(leagues)
+
+    def any_club(self, rng, n):
+        return np.minimum(np.searchsorted(self.cdf, rng.random(n), side='right'), len(self.cdf) - 1)
+
+    def home_club(self, rng, n):
+        return self.home[np.minimum(np.searchsorted(self.home_cdf, rng.random(n), side='right'), len(self.home) - 1)]
+
+    def next_club(self, rng, current):
+        """A destination per current club: same country (DOMESTIC_SHARE), else the home country
+        (HOME_PULL, from abroad) or anywhere. Never the current club itself."""
+        n = len(current)
+        country = self.country_idx[current]
+        domestic = np.minimum(np.searchsorted(self.country_cdf, country + rng.random(n), side='right'), len(self.cdf) - 1)
+        abroad = np.where((self.country[current] != HOME_COUNTRY) & (rng.random(n) < HOME_PULL),
+                          self.home_club(rng, n), self.any_club(rng, n))
+        dest = np.where(rng.random(n) < DOMESTIC_SHARE, domestic, abroad)
+        same = dest == current
+        dest[same] = self.any_club(rng, int(same.sum()))
+        same = dest == current
+        dest[same] = (dest[same] + 1) % len(self.cdf)
+        return dest
+
+# --- CAREERS ---
+def careers(rng, world, n_players, n_seasons):
+    """Each player's chain of moves (origin = previous destination), as flat arrays sorted
+    by player then move. Moves outside the season window are dropped."""
+    moves = np.minimum(rng.geometric(1 / MEAN_MOVES, n_players), 30)
+    season = rng.integers(-2, n_seasons, n_players)
+    current = np.where(rng.random(n_players) < HOME_START_SHARE,
+                       world.home_club(rng, n_players), world.any_club(rng, n_players))
+    players, seqs, season_idx, origins, dests = [], [], [], [], []
+    for k in range(int(moves.max())):
+        active = np.flatnonzero(moves > k)
+        dest = world.next_club(rng, current[active])
+        players.append(active)
+        seqs.append(np.full(len(active), k))
+        season_idx.append(season[active])
+        origins.append(current[active])
+        dests.append(dest)
+        current[active] = dest
+        season[active] += rng.choice(SEASON_STEP[0], len(active), p=SEASON_STEP[1])
+    player, seq, season_idx, origin, dest = (np.concatenate(a) for a in (players, seqs, season_idx, origins, dests))
+    order = np.lexsort((seq, player))
+    keep = order[(season_idx[order] >= 0) & (season_idx[order] < n_seasons)]
+    return player[keep], season_idx[keep], origin[keep], dest[keep]
+
+def format_fee(fee_m):
+    """Fee_Raw as the scraper stores it ('450k', '1.20m') and the Fee_Est_M that parses back from it."""
+    thousands = np.maximum(np.round(fee_m * 100) * 10, 10).astype(np.int64)
+    small = thousands < 1000
+    raw = np.where(small, pd.Series(thousands).astype(str).to_numpy(dtype=object) + "k",
+                   pd.Series(fee_m).map("{:.2f}m".format).to_numpy(dtype=object))
+    value = np.where(small, thousands / 1000, np.round(fee_m, 2))
+    return raw, value
+
+def generate_chunk(rng, world, n_players, first_player_id, season_labels):
+    player, season_idx, origin, dest = careers(rng, world, n_players, len(season_labels))
+    n = len(player)
+
+    # --- PLAYERS ---
+    names = (pd.Series(rng.choice(FIRST_NAMES, n_players)) + " " + pd.Series(make_words(rng, n_players, (2, 4)))).to_numpy(dtype=object)
+    first_season = np.full(n_players, LAST_SEASON_START + 1)
+    np.minimum.at(first_season, player, LAST_SEASON_START - len(season_labels) + 1 + season_idx)
+    birth_year = first_season - np.clip(np.round(rng.normal(21, 3.5, n_players)), 16, 34).astype(int)
+    dob = (pd.Series(rng.integers(1, 29, n_players)).astype(str) + "/" + pd.Series(rng.integers(1, 13, n_players)).astype(str)
+           + "/" + pd.Series(birth_year).astype(str)).to_numpy(dtype=object, copy=True)
+    dob[rng.random(n_players) < MISSING_DOB] = None
+    # Citizenship: the country of the player's first club, sometimes another one (or two)
+    first_club = np.zeros(n_players, dtype=np.int64)
+    first_row = np.flatnonzero(np.r_[True, player[1:] != player[:-1]]) if n else np.array([], dtype=np.int64)
+    first_club[player[first_row]] = origin[first_row]
+    citizenship = world.country[first_club].copy()
+    foreign = rng.random(n_players) < 0.2
+    citizenship[foreign] = world.country[world.any_club(rng, int(foreign.sum()))]
+    dual = rng.random(n_players) < DUAL_CITIZENSHIP
+    citizenship[dual] = citizenship[dual] + " / " + world.country[world.any_club(rng, int(dual.sum()))]
+    citizenship[rng.random(n_players) < MISSING_CITIZENSHIP] = None
+    player_value = rng.lognormal(np.log(0.3), 0.9, n_players)
+
+    # --- TRANSFERS ---
+    t_type = rng.choice(list(TYPE_SHARES), n, p=list(TYPE_SHARES.values()))
+    fee_raw = np.where(t_type == "Free Transfer", "free transfer", "-").astype(object)
+    loan = t_type == "Loan"
+    fee_raw[loan] = np.where(rng.random(int(loan.sum())) < END_OF_LOAN_SHARE, "End of loan", "loan transfer")
+    fee_est = np.zeros(n)
+    # Stronger buying clubs pay more often, and more
+    paid = (t_type == "Permanent") & (rng.random(n) < np.clip(0.5 * world.strength[dest], 0.02, 0.6))
+    raw, value = format_fee(0.3 * world.strength[dest[paid]] * rng.lognormal(0.0, 1.0, int(paid.sum())))
+    fee_raw[paid], fee_est[paid] = raw, value
+    unpaid = (t_type == "Permanent") & ~paid
+    fee_raw[unpaid] = np.where(rng.random(int(unpaid.sum())) < 0.25, "?", "-")
+
+    market_value = np.maximum(np.round(player_value[player] * (0.5 + world.strength[origin]) * 40) / 40, 0.025)
+    market_value[rng.random(n) < 0.005] = np.nan
+    same_player_next = np.r_[player[1:] == player[:-1], False]
+    next_value = np.where(same_player_next, np.r_[market_value[1:], np.nan], np.nan)
+
+    df = pd.DataFrame({
+        'TM_Player_ID': first_player_id + player,
+        'Player_Name': names[player],
+        'Season': np.array(season_labels, dtype=object)[season_idx],
+        'Origin_Club': world.name[origin],
+        'Origin_Club_ID': world.club_id[origin],
+        'Origin_League': world.league[origin],
+        'Destination_Club': world.name[dest],
+        'Destination_Club_ID': world.club_id[dest],
+        'Destination_League': world.league[dest],
+        'Fee_Raw': fee_raw,
+        'Fee_Est_M': fee_est,
+        'Transfer_Type': t_type,
+        'Date_of_Birth': dob[player],
+        'Citizenship': citizenship[player],
+        'Market_Value_At_Transfer': market_value,
+        'Market_Value_Next_Season': next_value,
+        'Origin_Country': world.country[origin],
+        'Destination_Country': world.country[dest],
+    })
+    df = apply_schema(df)
+    for side in ['Origin', 'Destination']:
+        # Partner clubs outside the known leagues: the scraper leaves them TBD with no country
+        unresolved = (df[f'{side}_Country'] != HOME_COUNTRY) & (rng.random(n) < UNRESOLVED_SHARE)
+        df.loc[unresolved, f'{side}_League'] = "TBD"
+        df.loc[unresolved, f'{side}_Country'] = None
+        df.loc[rng.random(n) < MISSING_CLUB_ID, f'{side}_Club_ID'] = pd.NA
+    return df[BASE_COLUMNS]
+
+def generate(rows, seed=SEED, league_count=LEAGUE_COUNT, season_count=SEASON_COUNT, chunk_rows=CHUNK_ROWS):
+    """Yields (world, chunk) with chunks totalling exactly `rows`. The same seed and
+    arguments (chunk size included) always give the same table."""
+    rng = np.random.default_rng(seed)
+    world = World(rng, league_count)
+    season_labels = seasons(season_count)
+    produced, next_player = 0, 100_000
+    rows_per_player = MEAN_MOVES * 0.7  # season-window trimming drops some moves; re-measured per chunk
+    while produced < rows:
+        want = min(chunk_rows, rows - produced)
+        n_players = int(want / rows_per_player * 1.05) + 10
+        chunk = generate_chunk(rng, world, n_players, next_player, season_labels)
+        # A career can repeat a move within one season (A -> B -> A -> B); the pipeline keys
+        # transfers on TRANSFER_KEY and would drop the repeat on import. Player IDs never span
+        # chunks, so deduping per chunk is enough.
+        chunk = chunk.drop_duplicates(TRANSFER_KEY, ignore_index=True)
+        rows_per_player = max(len(chunk) / n_players, 0.1)
+        next_player += n_players
+        # Over-asked slightly; cut the surplus
+        chunk = chunk.iloc[:want].reset_index(drop=True)
+        produced += len(chunk)
+        yield world, chunk
+
+def write_table(chunks, out_dir, csv_export=False):
+    """Streams chunks into out_dir/transfer_base_table.parquet (and .csv), with the
+    dashboard's derived columns, replacing the files only once everything is written."""
+    os.makedirs(out_dir, exist_ok=True)
+    parquet_path = os.path.join(out_dir, "transfer_base_table.parquet")
+    csv_path = os.path.join(out_dir, "transfer_base_table.csv")
+    csv_export = csv_export or pa is None
+    writer, total, world = None, 0, None
+    for i, (world, chunk) in enumerate(chunks):
+        chunk = derive_dashboard_columns(chunk)
+        if csv_export:
+            chunk.to_csv(f"{csv_path}.tmp", index=False, mode="w" if i == 0 else "a", header=i == 0)
+        if pa is not None:
+            table = to_arrow(chunk)
+            if writer is None:
+                writer = pq.ParquetWriter(f"{parquet_path}.tmp", table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+        total += len(chunk)
+        print(f"   ... {total:,} rows")
+    if csv_export:
+        os.replace(f"{csv_path}.tmp", csv_path)
+    elif os.path.exists(csv_path):
+        os.remove(csv_path)  # a stale CSV next to the new Parquet would win if edited later
+    # Parquet last, so its mtime is never older than the CSV (see table_store._parquet_is_current)
+    if writer is not None:
+        writer.close()
+        os.replace(f"{parquet_path}.tmp", parquet_path)
+    return world, total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic, schema-compatible transfer_base_table for scale testing")
+    parser.add_argument("--rows", type=parse_count, default=parse_count("100k"), help="Rows to generate, e.g. 250000, 500k, 10m")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--leagues", type=int, default=LEAGUE_COUNT, help="Leagues in the world (the 3 Romanian ones included)")
+    parser.add_argument("--seasons", type=int, default=SEASON_COUNT, help=f"Seasons ending with {seasons(1)[0]}")
+    parser.add_argument("--chunk-rows", type=parse_count, default=CHUNK_ROWS, help="Rows generated and written per step (bounds memory)")
+    parser.add_argument("--output", help=f"Output directory (default {OUTPUT_ROOT}/<rows>)")
+    parser.add_argument("--csv", action="store_true", help="Also write the CSV export")
+    args = parser.parse_args()
+
+    out_dir = args.output or os.path.join(OUTPUT_ROOT, count_label(args.rows))
+    print(f"🎲 Generating {args.rows:,} transfers (seed {args.seed}, {args.leagues} leagues, {args.seasons} seasons) -> '{out_dir}'")
+    start = time.perf_counter()
+    world, total = write_table(generate(args.rows, args.seed, args.leagues, args.seasons, args.chunk_rows), out_dir, args.csv)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {total:,} rows, {len(world.name):,} clubs in {world.leagues} leagues / {len(world.countries)} countries "
+          f"in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    print(f"▶️ Point the pipeline or the dashboard at it: TRANSFER_TABLE_DIR={out_dir} streamlit run dashboard.py")
@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import networkx as nx
+import numpy as np
+
+# Rows of nodes per repulsion step in grid_force_layout (bounds the n x cells temporaries)
+REPULSION_CHUNK = 2048
+
+def edge_fingerprint(G):
+    """Order-independent hash of an undirected edge set."""
+    edges = sorted(tuple(sorted((str(u), str(v)))) for u, v in G.edges())
+    return hashlib.sha1(repr(edges).encode("utf-8")).hexdigest()
+
+class LayoutCache:
+    """LRU cache of graph layouts keyed by edge-set fingerprint (plus layout fn and params).
+
+    A miss is warm-started from the positions of the most recently used layouts, so a
+    focus club or a min-strength change moves nodes a little instead of reshuffling
+    the whole picture. Returned dicts are shared between reruns: read, don't modify."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def spring_layout(self, G, k=2.0, seed=42, iterations=50):
+        return self.layout(G, nx.spring_layout, k=k, seed=seed, iterations=iterations)
+
+    def layout(self, G, layout_fn, **params):
+        """Any layout function taking (G, pos=..., **params) and returning [-1, 1] positions."""
+        key = (edge_fingerprint(G), layout_fn.__name__, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._layouts:
+                self._layouts.move_to_end(key)
+                self.hits += 1
+                return self._layouts[key]
+            self.misses += 1
+            warm = self._warm_start(G)
+
+        pos = layout_fn(G, pos=warm or None, **params)
+
+        with self._lock:
+            self._layouts[key] = pos
+            while len(self._layouts) > self.maxsize:
+                self._layouts.popitem(last=False)
+        return pos
+
+    def _warm_start(self, G):
+        # Newest layouts first; nodes never seen before get random starting positions.
+        # Cached layouts are rescaled to [-1, 1]; spring_layout iterates in [0, 1], and
+        # seeding it in the wrong domain makes the first steps scatter the nodes again.
+        warm = {}
+        for layout in reversed(self._layouts.values()):
+            for node in G:
+                if node not in warm and node in layout:
+                    warm[node] = (layout[node] + 1) / 2
+            if len(warm) == len(G): break
+        return warm
+
+def grid_force_layout(G, pos=None, iterations=50, grid=16, seed=42):
+    """Fruchterman-Reingold for large graphs, numpy only.
+
+    Repulsion comes from the mass-weighted centroid of each occupied grid cell rather
+    than from every other node (a one-level Barnes-Hut), so an iteration costs
+    O(nodes x cells + edges) instead of O(nodes²). Same [0, 1] working domain, cooling
+    schedule and [-1, 1] output as nx.spring_layout, so the two can seed each other."""
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0: return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    P = np.random.default_rng(seed).random((n, 2))
+    for node, xy in (pos or {}).items():
+        if node in index: P[index[node]] = xy
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+
+    k = np.sqrt(1.0 / n)
+    t = 0.1
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        # --- REPULSION (node vs. cell centroids) ---
+        lo = P.min(axis=0)
+        span = np.maximum(P.max(axis=0) - lo, 1e-9)
+        cell = np.minimum(((P - lo) / span * grid).astype(np.int64), grid - 1)
+        cell_id = cell[:, 0] * grid + cell[:, 1]
+        mass = np.bincount(cell_id, minlength=grid * grid)
+        occupied = np.flatnonzero(mass)
+        weight = mass[occupied]
+        centroids = np.column_stack([
+            np.bincount(cell_id, weights=P[:, 0], minlength=grid * grid)[occupied] / weight,
+            np.bincount(cell_id, weights=P[:, 1], minlength=grid * grid)[occupied] / weight,
+        ])
+        disp = np.empty_like(P)
+        for start in range(0, n, REPULSION_CHUNK):
+            block = P[start:start + REPULSION_CHUNK]
+            dx = block[:, 0, None] - centroids[None, :, 0]
+            dy = block[:, 1, None] - centroids[None, :, 1]
+            force = (weight * k * k) / np.maximum(dx * dx + dy * dy, 0.01 * k * k)
+            # sum_j force_ij * (p_i - c_j) == p_i * sum_j force_ij - force @ c
+            disp[start:start + REPULSION_CHUNK] = block * force.sum(axis=1)[:, None] - force @ centroids
+
+        # --- ATTRACTION (along edges) ---
+        if len(edges):
+            delta = P[edges[:, 0]] - P[edges[:, 1]]
+            pull = delta * np.linalg.norm(delta, axis=1)[:, None] / k
+            np.subtract.at(disp, edges[:, 0], pull)
+            np.add.at(disp, edges[:, 1], pull)
+
+        length = np.maximum(np.linalg.norm(disp, axis=1), 0.01)[:, None]
+        P += disp / length * np.minimum(length, t)
+        t -= dt
+
+    return dict(zip(nodes, nx.rescale_layout(P, scale=1)))
@@ -0,0 +1,225 @@
+import re
+
+# --- OPTIONAL FAST BACKENDS ---
+try:
+    # Lexbor engine; selectolax 1.0 dropped the old Modest-based selectolax.parser
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from bs4 import BeautifulSoup, SoupStrainer
+from run_metrics import METRICS
+
+CLUB_HREF = re.compile(r'/verein/')
+BOX_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' box ')]"
+
+def _xpath_class(tag, cls):
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+def _as_text(html):
+    # Pages come in as response bytes (UTF-8) or cached text. Decoding here rather than
+    # letting a parser sniff the bytes keeps every backend on the same text: lxml falls
+    # back to latin-1 when a page has no <meta charset>.
+    return html.decode('utf-8', errors='replace') if isinstance(html, bytes) else html
+
+# --- BACKENDS ---
+# Every backend returns the same plain structures:
+#   transfer_boxes(html, keep_headline) -> [(headline_text, [row_dict, ...]), ...]
+#       row_dict keys: player_name, player_href, partner_name, partner_href, fee_raw
+#   club_links(html) -> [(href, title_or_None), ...] for each row of table.items
+# Only boxes whose headline passes keep_headline get their rows parsed.
+
+class SoupBackend:
+    """Reference implementation (html.parser). Uses SoupStrainer so only the transfer
+    boxes / the items table are built into a tree, not the whole page."""
+    name = "bs4"
+
+    def transfer_boxes(self, html, keep_headline):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('div', class_='box'))
+        result = []
+        for box in soup.find_all('div', class_='box'):
+            headline = box.find('h2', class_='content-box-headline')
+            if not headline: continue
+            headline_text = headline.get_text(strip=True)
+            if not keep_headline(headline_text): continue
+            table = box.find('table')
+            if not table: continue
+
+            rows = []
+            for row in table.find_all('tr'):
+                if row.parent.name != 'tbody': continue
+                player_cell = row.find('td', class_='hauptlink')
+                if not player_cell: continue
+                player_link = player_cell.find('a')
+                if not player_link: continue
+                partner_cell = row.find('td', class_='no-border-links')
+                if not partner_cell: continue
+                partner_link = partner_cell.find('a')
+                fee_cell = row.find_all('td', class_='rechts')
+                rows.append({
+                    'player_name': player_link.get_text(strip=True),
+                    'player_href': player_link.get('href'),
+                    'partner_name': partner_cell.get_text(strip=True),
+                    'partner_href': partner_link.get('href') if partner_link else None,
+                    'fee_raw': fee_cell[0].get_text(strip=True) if fee_cell else "-",
+                })
+            result.append((headline_text, rows))
+        return result
+
+    def club_links(self, html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table', class_='items'))
+        table = soup.find('table', class_='items')
+        if not table: return []
+        links = []
+        for row in table.find_all('tr'):
+            link_tag = row.find('a', class_='vereinprofil_tooltip')
+            if not link_tag:
+                link_tag = row.find('a', href=CLUB_HREF)
+            if link_tag and link_tag.get('href'):
+                links.append((link_tag['href'], link_tag.get('title')))
+        return links
+
+class LxmlBackend:
+    name = "lxml"
+
+    @staticmethod
+    def _text(el):
+        # Same as bs4's get_text(strip=True): strip each text node, join with nothing
+        return "".join(t.strip() for t in el.xpath('.//text()'))
+
+    def transfer_boxes(self, html, keep_headline):
+        root = lxml.html.fromstring(_as_text(html))
+        result = []
+        for box in root.xpath(BOX_XPATH):
+            headline = box.xpath(_xpath_class('h2', 'content-box-headline'))
+            if not headline: continue
+            headline_text = self._text(headline[0])
+            if not keep_headline(headline_text): continue
+            table = box.xpath('.//table')
+            if not table: continue
+
+            rows = []
+            for row in table[0].xpath('.//tr[parent::tbody]'):
+                player_cell = row.xpath(_xpath_class('td', 'hauptlink'))
+                if not player_cell: continue
+                player_link = player_cell[0].xpath('.//a')
+                if not player_link: continue
+                partner_cell = row.xpath(_xpath_class('td', 'no-border-links'))
+                if not partner_cell: continue
+                partner_link = partner_cell[0].xpath('.//a')
+                fee_cell = row.xpath(_xpath_class('td', 'rechts'))
+                rows.append({
+                    'player_name': self._text(player_link[0]),
+                    'player_href': player_link[0].get('href'),
+                    'partner_name': self._text(partner_cell[0]),
+                    'partner_href': partner_link[0].get('href') if partner_link else None,
+                    'fee_raw': self._text(fee_cell[0]) if fee_cell else "-",
+                })
+            result.append((headline_text, rows))
+        return result
+
+    def club_links(self, html):
+        root = lxml.html.fromstring(_as_text(html))
+        table = root.xpath(_xpath_class('table', 'items'))
+        if not table: return []
+        links = []
+        for row in table[0].xpath('.//tr'):
+            link_tag = row.xpath(_xpath_class('a', 'vereinprofil_tooltip'))
+            if not link_tag:
+                link_tag = row.xpath(".//a[contains(@href, '/verein/')]")
+            if link_tag and link_tag[0].get('href'):
+                links.append((link_tag[0].get('href'), link_tag[0].get('title')))
+        return links
+
+class SelectolaxBackend:
+    """Fastest option (selectolax's Lexbor parser). Note: the HTML5 parser inserts a <tbody> into tables that lack one,
+    which Transfermarkt tables always have anyway."""
+    name = "selectolax"
+
+    def transfer_boxes(self, html, keep_headline):
+        tree = HTMLParser(_as_text(html))
+        result = []
+        for box in tree.css('div.box'):
+            headline = box.css_first('h2.content-box-headline')
+            if not headline: continue
+            headline_text = headline.text(strip=True)
+            if not keep_headline(headline_text): continue
+            table = box.css_first('table')
+            if not table: continue
+
+            rows = []
+            for row in table.css('tbody > tr'):
+                player_cell = row.css_first('td.hauptlink')
+                if not player_cell: continue
+                player_link = player_cell.css_first('a')
+                if not player_link: continue
+                partner_cell = row.css_first('td.no-border-links')
+                if not partner_cell: continue
+                partner_link = partner_cell.css_first('a')
+                fee_cell = row.css_first('td.rechts')
+                rows.append({
+                    'player_name': player_link.text(strip=True),
+                    'player_href': player_link.attributes.get('href'),
+                    'partner_name': partner_cell.text(strip=True),
+                    'partner_href': partner_link.attributes.get('href') if partner_link else None,
+                    'fee_raw': fee_cell.text(strip=True) if fee_cell else "-",
+                })
+            result.append((headline_text, rows))
+        return result
+
+    def club_links(self, html):
+        tree = HTMLParser(_as_text(html))
+        table = tree.css_first('table.items')
+        if not table: return []
+        links = []
+        for row in table.css('tr'):
+            link_tag = row.css_first('a.vereinprofil_tooltip') or row.css_first("a[href*='/verein/']")
+            if link_tag and link_tag.attributes.get('href'):
+                links.append((link_tag.attributes['href'], link_tag.attributes.get('title')))
+        return links
+
+BACKENDS = {"selectolax": SelectolaxBackend, "lxml": LxmlBackend, "bs4": SoupBackend}
+_available = {"selectolax": HTMLParser is not None, "lxml": lxml is not None, "bs4": True}
+_backend = None
+
+def set_backend(name="auto"):
+    global _backend
+    if name == "auto":
+        name = next(n for n in BACKENDS if _available[n])
+    elif not _available[name]:
+        print(f"⚠️ Parser '{name}' is not installed. Falling back to bs4.")
+        name = "bs4"
+    _backend = BACKENDS[name]()
+    return _backend
+
+def available_backends():
+    return [name for name in BACKENDS if _available[name]]
+
+def get_backend():
+    return _backend or set_backend()
+
+def add_parser_arguments(parser):
+    parser.add_argument("--parser", choices=["auto"] + list(BACKENDS), default="auto",
+                        help="HTML parsing backend (auto = fastest installed)")
+
+# --- TIMED ENTRY POINTS ---
+# Timings go to the run's METRICS, which parse_report() summarizes
+def transfer_boxes(html, keep_headline=lambda text: True):
+    with METRICS.parsing("transfer page"):
+        return get_backend().transfer_boxes(html, keep_headline)
+
+def club_links(html):
+    with METRICS.parsing("league table"):
+        return get_backend().club_links(html)
+
+def parse_report():
+    lines = []
+    for kind, p in METRICS.snapshot()['parse_seconds'].items():
+        lines.append(f"⏱️ Parse [{get_backend().name}] {kind}: {p['pages']} pages, "
+                     f"mean {p['sum'] / p['pages'] * 1000:.1f}ms, p50 {p['p50'] * 1000:.1f}ms, max {p['max'] * 1000:.1f}ms")
+    return "\n".join(lines)
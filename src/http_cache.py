@@ -0,0 +1,116 @@
+import hashlib
+import gzip
+import os
+import time
+from run_metrics import METRICS, http_get
+
+# --- CONFIGURATION ---
+CACHE_DIR = "data/cache/http"
+DEFAULT_TTL = 7 * 24 * 3600          # seconds; pages older than this are re-downloaded
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # compressed bytes on disk before the oldest pages are evicted
+
+class OfflineCacheMiss(Exception):
+    pass
+
+class ResponseCache:
+    """Disk cache of raw page bodies, keyed by the SHA-256 of the URL and stored gzip-compressed.
+
+    The file mtime is the fetch time: it drives both the TTL check and eviction (oldest first).
+    In offline mode nothing is downloaded and stale pages are still served."""
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=MAX_CACHE_BYTES, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def path_for(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.html.gz")
+
+    def _entries(self):
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir(): continue
+            for entry in os.scandir(sub.path):
+                st = entry.stat()
+                yield entry.path, st.st_mtime, st.st_size
+
+    def get(self, url):
+        path = self.path_for(url)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if not self.offline and self.ttl is not None and age > self.ttl:
+                return None
+            with gzip.open(path, "rb") as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def put(self, url, body):
+        path = self.path_for(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Write then rename so an interrupted run never leaves a truncated page behind
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        self._size += os.path.getsize(path) - old_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        # Trim to 90% so we don't evict again on the very next write
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if total <= target: break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError: pass
+        self._size = total
+
+    def lookup(self, url):
+        """The cached body, counted as a hit, or None, counted as a miss. Raises
+        OfflineCacheMiss in offline mode when the page isn't cached."""
+        body = self.get(url)
+        if body is not None:
+            self.hits += 1
+            METRICS.record_cache_hit(len(body))
+            return body
+        self.misses += 1
+        if self.offline:
+            raise OfflineCacheMiss(f"Not in cache (offline mode): {url}")
+        return None
+
+    def download(self, url, headers=None, timeout=30):
+        """Fetches the page from the network and caches it (for a lookup() miss)."""
+        response = http_get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        self.put(url, response.content)
+        return response.content
+
+    def fetch(self, url, headers=None, timeout=30):
+        """Returns (body, from_cache). Raises OfflineCacheMiss in offline mode when the page isn't cached."""
+        body = self.lookup(url)
+        if body is not None:
+            return body, True
+        return self.download(url, headers=headers, timeout=timeout), False
+
+def add_cache_arguments(parser):
+    parser.add_argument("--offline", action="store_true", help="Replay cached pages only; never hit the network")
+    parser.add_argument("--no-cache", action="store_true", help="Always download, bypassing the response cache")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600, help="Cache lifetime in hours")
+
+def cache_from_args(args):
+    if args.no_cache and args.offline:
+        raise SystemExit("❌ --offline needs the cache; drop --no-cache.")
+    if args.no_cache:
+        return None
+    return ResponseCache(ttl=args.cache_ttl * 3600, offline=args.offline)
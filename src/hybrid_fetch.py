@@ -0,0 +1,97 @@
+import logging
+import time
+import requests
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from run_metrics import METRICS, http_get
+
+logger = logging.getLogger()
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# Status codes and page markers that mean "a bot wall answered, not Transfermarkt"
+CHALLENGE_STATUSES = {403, 429, 503}
+CHALLENGE_MARKERS = ("cf-challenge", "challenge-platform", "Just a moment...", "<title>Attention Required")
+
+def is_challenge_page(status, html):
+    if status in CHALLENGE_STATUSES: return True
+    head = html[:20000]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+class HybridFetcher:
+    """Per-worker page fetcher: a plain HTTP GET first, headless Chrome only when needed.
+
+    A page escalates to the browser when the GET fails, returns a Cloudflare challenge, or
+    lacks `ready_class` (content the page renders client-side). Chrome is started lazily on
+    the first escalation, so a worker whose pages all come back over HTTP never launches one.
+    Exposes quit() so BrowserPool can treat it like a driver."""
+
+    def __init__(self, init_browser=None, driver=None, browser_only=False):
+        self.init_browser = init_browser
+        self.driver = driver
+        self.browser_only = browser_only
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.http_pages = 0
+        self.browser_pages = 0
+
+    def _http_html(self, url, ready_class):
+        try:
+            response = http_get(url, timeout=15, session=self.session, is_blocked=is_challenge_page)
+        except requests.RequestException as e:
+            logger.info(f"   ↪️ HTTP failed ({e}); using browser.")
+            return None
+        html = response.text
+        if is_challenge_page(response.status_code, html):
+            logger.info("   ↪️ Challenge page over HTTP; using browser.")
+            return None
+        if response.status_code != 200:
+            logger.info(f"   ↪️ HTTP {response.status_code}; using browser.")
+            return None
+        if ready_class and ready_class not in html:
+            logger.info(f"   ↪️ '{ready_class}' missing over HTTP; using browser.")
+            return None
+        return html
+
+    def _browser_html(self, url, ready_class):
+        if self.driver is None:
+            self.driver = self.init_browser()
+        start = time.perf_counter()
+        self.driver.get(url)
+        latency = time.perf_counter() - start
+        if "Challenge" in self.driver.title or "Cloudflare" in self.driver.title:
+            METRICS.record_request(latency, source="browser", blocked=True)
+            logger.warning("   🛑 ACCESS BLOCKED: Cloudflare Challenge.")
+            return None
+        if ready_class:
+            try:
+                WebDriverWait(self.driver, 3).until(EC.presence_of_element_located((By.CLASS_NAME, ready_class)))
+            except:
+                logger.warning(f"   ⚠️ '{ready_class}' not found in browser either.")
+        html = self.driver.page_source
+        METRICS.record_request(latency, len(html.encode("utf-8")), source="browser")
+        return html
+
+    def get(self, url, ready_class=None):
+        """Returns the page HTML, or None when even the browser got a challenge page."""
+        if not self.browser_only:
+            html = self._http_html(url, ready_class)
+            if html is not None:
+                self.http_pages += 1
+                return html
+            METRICS.record_fallback()
+        html = self._browser_html(url, ready_class)
+        if html is not None: self.browser_pages += 1
+        return html
+
+    def quit(self):
+        self.session.close()
+        if self.driver is not None:
+            self.driver.quit()
+
+def add_fetch_arguments(parser):
+    parser.add_argument("--browser-only", action="store_true", help="Skip the HTTP attempt and render every page in Chrome")
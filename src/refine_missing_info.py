@@ -6,15 +6,17 @@ import re
 import logging
 import sys
 import math
+import argparse
 from bs4 import BeautifulSoup
+from browser_pool import BrowserPool, add_pool_arguments
+from work_db import WorkDB
+from hybrid_fetch import HybridFetcher, add_fetch_arguments
+from run_metrics import METRICS
 
 # --- SELENIUM IMPORTS ---
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 # --- LOGGING ---
@@ -22,7 +24,6 @@ logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.
 logger = logging.getLogger()
 
 # --- CONSTANTS ---
-DATA_FILE = "data/processed/transfer_base_table.csv"
 
 # 🛑 IGNORE LIST: Dead ends
 IGNORED_NAMES = {
@@ -31,6 +32,7 @@ IGNORED_NAMES = {
 }
 # 0/NaN = Null, 75 = Unknown, 515 = Without Club, 123 = Retired
 IGNORED_IDS = {0, 75, 515, 123}
+BAD_VALUES = ["TBD", "Unknown", "nan"]
 
 # --- HELPERS ---
 def get_start_year(season_str):
@@ -56,129 +58,126 @@ def init_driver():
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
     return driver
 
-def get_historical_data(driver, club_id, season_str, club_name):
+def get_historical_data(fetcher, club_id, season_str, club_name):
     year = get_start_year(season_str)
     url = f"https://www.transfermarkt.com/club/startseite/verein/{club_id}/saison_id/{year}"
     
     logger.info(f"   🕵️ Visiting: {club_name} ({season_str})")
     
     try:
-        driver.get(url)
-        try:
-            WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.CLASS_NAME, "data-header__details")))
-        except: pass
-
-        html = driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        league = None
-        country = None
-
-        # --- 1. EXTRACT HISTORICAL LEAGUE (STRICT) ---
-        try:
-            headlines = soup.select("h2.content-box-headline")
-            for h2 in headlines:
-                text = h2.get_text(strip=True)
-                if "Table section" in text:
-                    clean_text = text.replace("Table section", "").strip()
-                    clean_text = re.sub(r'\s\d{2}/\d{2}$', '', clean_text)
-                    clean_text = re.sub(r'\s\d{4}$', '', clean_text)
-                    league = clean_text.strip()
-                    break 
-        except: pass
-
-        # --- 2. EXTRACT COUNTRY ---
-        try:
-            flag = soup.select_one(".data-header__content img.flaggenrahmen")
-            if flag and flag.get('title'):
-                country = flag['title']
-        except: pass
-
-        return league, country
+        html = fetcher.get(url, ready_class="data-header__details")
+        if html is None: return None, None
+        with METRICS.parsing("club page"):
+            return parse_club_page(html)
 
     except Exception as e:
         logger.error(f"      ❌ Error visiting page: {e}")
         return None, None
 
+def parse_club_page(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    league = None
+    country = None
+
+    # --- 1. EXTRACT HISTORICAL LEAGUE (STRICT) ---
+    try:
+        headlines = soup.select("h2.content-box-headline")
+        for h2 in headlines:
+            text = h2.get_text(strip=True)
+            if "Table section" in text:
+                clean_text = text.replace("Table section", "").strip()
+                clean_text = re.sub(r'\s\d{2}/\d{2}$', '', clean_text)
+                clean_text = re.sub(r'\s\d{4}$', '', clean_text)
+                league = clean_text.strip()
+                break 
+    except: pass
+
+    # --- 2. EXTRACT COUNTRY ---
+    try:
+        flag = soup.select_one(".data-header__content img.flaggenrahmen")
+        if flag and flag.get('title'):
+            country = flag['title']
+    except: pass
+
+    return league, country
+
+# --- VECTORIZED TASKS / WRITE-BACK ---
+SIDES = ['Origin', 'Destination']
+
+def stack_sides(df):
+    """One long frame of (Club_ID, Club_Name, Season, League, Country), origins first."""
+    parts = []
+    for side in SIDES:
+        parts.append(pd.DataFrame({
+            'Club_ID': pd.to_numeric(df[f'{side}_Club_ID'], errors='coerce'),
+            'Club_Name': df[f'{side}_Club'],
+            'Season': df['Season'],
+            'League': df[f'{side}_League'],
+            'Country': df[f'{side}_Country'],
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+def find_missing_contexts(df):
+    stacked = stack_sides(df)
+    league_bad = stacked['League'].isna() | stacked['League'].astype(str).isin(BAD_VALUES)
+    country_bad = stacked['Country'].isna() | stacked['Country'].astype(str).isin(["nan", ""])
+    valid = (
+        stacked['Club_ID'].notna() &
+        ~stacked['Club_ID'].isin(IGNORED_IDS) &
+        ~stacked['Club_Name'].astype(str).isin(IGNORED_NAMES)
+    )
+    todo = stacked[valid & (league_bad | country_bad)]
+    if todo.empty: return []
+
+    # Last name seen wins (destination over origin), as the old row-by-row scan did
+    tasks = todo.groupby(['Club_ID', 'Season'], sort=False)['Club_Name'].last().reset_index()
+    tasks = tasks.sort_values('Club_ID', kind='stable')
+    return [(int(cid), season, cname) for cid, season, cname in tasks.itertuples(index=False)]
+
 def main():
-    if not os.path.exists(DATA_FILE):
-        print(f"❌ Error: {DATA_FILE} not found.")
+    parser = argparse.ArgumentParser(description="Rescue missing league/country context from club pages")
+    add_pool_arguments(parser)
+    add_fetch_arguments(parser)
+    args = parser.parse_args()
+    METRICS.start("refine_missing_info")
+
+    db = WorkDB()
+    try:
+        refine(db, args)
+    finally:
+        db.close()
+
+def refine(db, args):
+    df = db.transfers_frame()
+    if df.empty:
+        print("❌ Error: no transfers in the working database. Run the scraper first.")
         return
 
-    df = pd.read_csv(DATA_FILE, low_memory=False)
-    
-    bad_values = ["TBD", "Unknown", "nan"]
-    unique_tasks = {} 
-    
     print("🔍 Scanning rows... (Skipping Retired/Empty IDs)")
-
-    def needs_fix(league_val, country_val):
-        l_bad = str(league_val) in bad_values or pd.isna(league_val)
-        c_bad = pd.isna(country_val) or str(country_val) in ["nan", ""]
-        return l_bad or c_bad
-
-    def is_valid_club(cid_raw, cname):
-        # 1. Handle NaN / Float conversion safety
-        try:
-            if pd.isna(cid_raw): return False
-            cid = int(cid_raw)
-        except: return False
+    task_list = find_missing_contexts(df)
         
-        # 2. Check Blocklists
-        if cid in IGNORED_IDS: return False
-        if str(cname) in IGNORED_NAMES: return False
-        return True
-
-    # Scan Origin
-    for idx, row in df.iterrows():
-        try:
-            cid_raw = row['Origin_Club_ID']
-            cname = row['Origin_Club']
-            
-            if is_valid_club(cid_raw, cname):
-                cid = int(cid_raw)
-                if needs_fix(row['Origin_League'], row['Origin_Country']):
-                    unique_tasks[(cid, row['Season'])] = cname
-        except: pass
-
-    # Scan Destination
-    for idx, row in df.iterrows():
-        try:
-            cid_raw = row['Destination_Club_ID']
-            cname = row['Destination_Club']
-            
-            if is_valid_club(cid_raw, cname):
-                cid = int(cid_raw)
-                if needs_fix(row['Destination_League'], row['Destination_Country']):
-                    unique_tasks[(cid, row['Season'])] = cname
-        except: pass
-        
-    if not unique_tasks:
+    if not task_list:
         print("✅ No valid missing data found!")
         return
-
-    task_list = [(k[0], k[1], v) for k, v in unique_tasks.items()]
-    task_list.sort(key=lambda x: x[0])
     
     print(f"📉 Filter Report:")
     print(f"   - Unique Valid Tasks: {len(task_list)}")
     
-    print("\n🚑 Starting Strict Rescue Mission...")
-    driver = init_driver()
+    print(f"\n🚑 Starting Strict Rescue Mission ({args.workers} browser workers)...")
+    pool = BrowserPool(args.workers, lambda: HybridFetcher(init_browser=init_driver, browser_only=args.browser_only),
+                       lambda fetcher, task: get_historical_data(fetcher, *task),
+                       is_failure=lambda result: not (result[0] or result[1]), rate=args.rate)
     
     updates_made = 0
+    resolved = []
     try:
-        for i, (cid, season, cname) in enumerate(task_list):
-            league, country = get_historical_data(driver, cid, season, cname)
+        for i, ((cid, season, cname), result) in enumerate(pool.run(task_list)):
+            league, country = result or (None, None)
             
             if league or country:
-                mask_o = (df['Origin_Club_ID'] == cid) & (df['Season'] == season)
-                if league: df.loc[mask_o, 'Origin_League'] = league
-                if country: df.loc[mask_o, 'Origin_Country'] = country
-                
-                mask_d = (df['Destination_Club_ID'] == cid) & (df['Season'] == season)
-                if league: df.loc[mask_d, 'Destination_League'] = league
-                if country: df.loc[mask_d, 'Destination_Country'] = country
+                resolved.append((cid, season, league or None, country or None))
+                METRICS.add_rows(1)
 
                 log_str = f"      ✅ Found:"
                 if league: log_str += f" League='{league}'"
@@ -188,15 +187,17 @@ def main():
             else:
                 logger.warning(f"      ⚠️ No strict data found for {cname}")
 
+            # Checkpoint: one transaction touching only the matching (Club_ID, Season) rows
             if i > 0 and i % 10 == 0:
-                df.to_csv(DATA_FILE, index=False)
+                db.update_club_seasons(resolved)
+                resolved = []
                 
     except KeyboardInterrupt:
         print("\n🛑 Interrupted.")
     finally:
-        driver.quit()
-        df.to_csv(DATA_FILE, index=False)
+        db.update_club_seasons(resolved)
+        db.export()
         print(f"🏁 Done. Updated {updates_made} unique contexts.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
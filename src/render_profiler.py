@@ -0,0 +1,87 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+import pandas as pd
+
+# --- CONFIG ---
+PROFILE_FILE = "data/processed/dashboard_profile.jsonl"
+HISTORY_RERUNS = 50
+
+class RenderProfiler:
+    """Per-rerun section timings for dashboard.py.
+
+    Checkpoint style: lap(name) charges the time since the previous checkpoint to `name`,
+    so marking where each section ends is enough (no re-indenting the script). Until
+    begin() is called every lap() is a no-op, which is what the dashboard gets when
+    profiling is off. With memory=True, tracemalloc adds each section's net allocation and
+    peak; it is process-wide and slows everything down, so it is for one session at a time.
+    Finished reruns go into a rolling history of the last HISTORY_RERUNS."""
+
+    def __init__(self, history=HISTORY_RERUNS):
+        self.history = deque(maxlen=history)
+        self.reruns = 0
+        self.current = None
+        self.memory = False
+
+    def begin(self, memory=False):
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.reruns += 1
+        self.current = {'rerun': self.reruns, 'started': time.strftime("%Y-%m-%dT%H:%M:%S"), 'sections': []}
+        if memory:
+            self._memory_mark = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._mark = time.perf_counter()
+
+    def lap(self, name):
+        if self.current is None: return
+        section = {'section': name, 'ms': round((time.perf_counter() - self._mark) * 1000, 2)}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            section['alloc_mb'] = round((current - self._memory_mark) / 1e6, 3)
+            section['peak_mb'] = round((peak - self._memory_mark) / 1e6, 3)
+            self._memory_mark = current
+            tracemalloc.reset_peak()
+        self.current['sections'].append(section)
+        # Restart the clock after the bookkeeping so it isn't charged to the next section
+        self._mark = time.perf_counter()
+
+    def end(self):
+        """Closes the rerun and returns it, or None if profiling never began."""
+        run, self.current = self.current, None
+        if run is None: return None
+        run['total_ms'] = round(sum(s['ms'] for s in run['sections']), 2)
+        self.history.append(run)
+        return run
+
+    # --- VIEWS ---
+    @staticmethod
+    def sections_frame(run):
+        frame = pd.DataFrame(run['sections'])
+        # A section marked more than once (e.g. one lap per branch) is summed
+        frame = frame.groupby('section', sort=False).sum(numeric_only=True).reset_index()
+        frame['share'] = frame['ms'] / max(run['total_ms'], 1e-9)
+        return frame
+
+    def history_frame(self):
+        """Reruns x sections (ms), oldest first."""
+        rows = [{'rerun': run['rerun'], 'section': s['section'], 'ms': s['ms']}
+                for run in self.history for s in run['sections']]
+        if not rows: return pd.DataFrame()
+        return pd.DataFrame(rows).pivot_table(index='rerun', columns='section', values='ms', aggfunc='sum', sort=False)
+
+    def to_json(self):
+        return json.dumps(list(self.history), indent=1)
+
+    def dump(self, path=PROFILE_FILE):
+        """Appends the history to a JSONL file (one rerun per line). Returns the rerun count."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for run in self.history:
+                f.write(json.dumps(run) + "\n")
+        return len(self.history)
@@ -0,0 +1,217 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+import requests
+
+# --- CONFIG ---
+METRICS_DIR = "data/processed/metrics"
+HISTORY_FILE = "runs.jsonl"
+PROM_PREFIX = "transfer_map"
+BLOCKED_STATUSES = {403, 429, 503}  # bot-wall / rate-limit answers
+QUANTILES = (0.5, 0.9, 0.99)
+
+def percentile(values, q):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+class RunMetrics:
+    """Counters and timings for one run of one pipeline stage (a scraper script).
+
+    Thread-safe: browser workers, asyncio worker threads and the main loop all record
+    into the process-wide METRICS. Requests are split by source (http / browser / cache);
+    latencies are kept whole, runs are a few thousand pages at most. finish() writes
+    <stage>.json and <stage>.prom (Prometheus text format, for a textfile collector) and
+    appends the run to runs.jsonl."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.run_id = uuid.uuid4().hex[:12]
+            self.started = time.time()
+            self._clock = time.perf_counter()
+            self.requests = {}   # source -> count
+            self.bytes = {}      # source -> bytes
+            self.latencies = {}  # source -> [seconds]
+            self.errors = 0
+            self.blocked = 0
+            self.retries = 0
+            self.fallbacks = 0   # HTTP attempts that escalated to the browser
+            self.parse = {}      # kind -> [seconds]
+            self.rows = 0
+            self.sleep_seconds = 0.0
+
+    def start(self, stage, export=True):
+        """Begins a run of `stage`; with export, the metrics are written when the process exits."""
+        self.reset()
+        self.stage = stage
+        if export: atexit.register(self.finish)
+        return self
+
+    # --- RECORDING ---
+    def record_request(self, seconds, nbytes=0, source="http", status=None, blocked=None, ok=True):
+        with self._lock:
+            self.requests[source] = self.requests.get(source, 0) + 1
+            self.bytes[source] = self.bytes.get(source, 0) + nbytes
+            self.latencies.setdefault(source, []).append(seconds)
+            if not ok: self.errors += 1
+            if blocked if blocked is not None else status in BLOCKED_STATUSES:
+                self.blocked += 1
+
+    def record_cache_hit(self, nbytes):
+        with self._lock:
+            self.requests['cache'] = self.requests.get('cache', 0) + 1
+            self.bytes['cache'] = self.bytes.get('cache', 0) + nbytes
+
+    def record_blocked(self):
+        with self._lock: self.blocked += 1
+
+    def record_retry(self):
+        with self._lock: self.retries += 1
+
+    def record_fallback(self):
+        with self._lock: self.fallbacks += 1
+
+    def record_parse(self, kind, seconds):
+        with self._lock: self.parse.setdefault(kind, []).append(seconds)
+
+    @contextlib.contextmanager
+    def parsing(self, kind):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_parse(kind, time.perf_counter() - start)
+
+    def add_rows(self, n):
+        with self._lock: self.rows += n
+
+    def record_sleep(self, seconds):
+        with self._lock: self.sleep_seconds += seconds
+
+    def sleep(self, seconds):
+        """time.sleep that counts towards the run's politeness/rate-limit time."""
+        if seconds <= 0: return
+        time.sleep(seconds)
+        self.record_sleep(seconds)
+
+    # --- REPORTING ---
+    def snapshot(self):
+        with self._lock:
+            network = sum(sum(v) for v in self.latencies.values())
+            parse = sum(sum(v) for v in self.parse.values())
+            # Whichever ate the most time; with concurrent workers these can overlap wall time
+            shares = {'network-bound': network, 'parse-bound': parse, 'rate-limited': self.sleep_seconds}
+            return {
+                'run_id': self.run_id, 'stage': self.stage,
+                'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                'wall_seconds': round(time.perf_counter() - self._clock, 3),
+                'requests': dict(self.requests), 'bytes': dict(self.bytes),
+                'latency_seconds': {
+                    source: {'count': len(v), 'sum': round(sum(v), 4), 'max': round(max(v), 4),
+                             **{f'p{int(q * 100)}': round(percentile(v, q), 4) for q in QUANTILES}}
+                    for source, v in self.latencies.items() if v},
+                'errors': self.errors, 'blocked_pages': self.blocked, 'retries': self.retries,
+                'browser_fallbacks': self.fallbacks,
+                'parse_seconds': {kind: {'pages': len(v), 'sum': round(sum(v), 4),
+                                         'p50': round(percentile(v, 0.5), 4), 'max': round(max(v), 4)}
+                                  for kind, v in self.parse.items() if v},
+                'rows': self.rows, 'sleep_seconds': round(self.sleep_seconds, 3),
+                'bottleneck': max(shares, key=shares.get) if any(shares.values()) else None,
+            }
+
+    def prometheus(self, snap=None):
+        snap = snap or self.snapshot()
+        stage = f'stage="{snap["stage"]}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PROM_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROM_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join([stage] + [f'{k}="{v}"' for k, v in labels.items()])
+                lines.append(f"{PROM_PREFIX}_{name}{{{label_text}}} {value}")
+
+        metric("run_start_timestamp_seconds", "gauge", "Unix time the last run started", [({}, round(self.started, 3))])
+        metric("run_duration_seconds", "gauge", "Wall time of the last run", [({}, snap['wall_seconds'])])
+        metric("requests", "gauge", "Pages requested in the last run, by source",
+               [({'source': s}, n) for s, n in snap['requests'].items()])
+        metric("response_bytes", "gauge", "Page bytes received in the last run, by source",
+               [({'source': s}, n) for s, n in snap['bytes'].items()])
+        latency = []
+        for source, l in snap['latency_seconds'].items():
+            latency += [({'source': source, 'quantile': str(q)}, l[f'p{int(q * 100)}']) for q in QUANTILES]
+        metric("request_latency_seconds", "summary", "Request latency in the last run", latency)
+        for source, l in snap['latency_seconds'].items():
+            lines.append(f'{PROM_PREFIX}_request_latency_seconds_sum{{{stage},source="{source}"}} {l["sum"]}')
+            lines.append(f'{PROM_PREFIX}_request_latency_seconds_count{{{stage},source="{source}"}} {l["count"]}')
+        metric("request_errors", "gauge", "Failed requests in the last run", [({}, snap['errors'])])
+        metric("blocked_pages", "gauge", "Challenge / blocked pages in the last run", [({}, snap['blocked_pages'])])
+        metric("retries", "gauge", "Re-queued page visits in the last run", [({}, snap['retries'])])
+        metric("browser_fallbacks", "gauge", "HTTP fetches escalated to the browser", [({}, snap['browser_fallbacks'])])
+        metric("parse_seconds", "gauge", "Time spent parsing pages, by page kind",
+               [({'kind': k}, p['sum']) for k, p in snap['parse_seconds'].items()])
+        metric("parsed_pages", "gauge", "Pages parsed, by page kind",
+               [({'kind': k}, p['pages']) for k, p in snap['parse_seconds'].items()])
+        metric("rows", "gauge", "Rows produced by the last run", [({}, snap['rows'])])
+        metric("sleep_seconds", "gauge", "Time spent in politeness / rate-limit sleeps", [({}, snap['sleep_seconds'])])
+        return "\n".join(lines) + "\n"
+
+    def summary(self, snap=None):
+        snap = snap or self.snapshot()
+        network = sum(snap['requests'].get(s, 0) for s in snap['requests'] if s != 'cache')
+        mb = sum(snap['bytes'].values()) / 1e6
+        lines = [f"📊 Run {snap['run_id']} [{snap['stage']}]: {snap['wall_seconds']:.1f}s, {snap['rows']} rows, "
+                 f"{network} requests + {snap['requests'].get('cache', 0)} cached ({mb:.1f} MB)"]
+        for source, l in snap['latency_seconds'].items():
+            lines.append(f"   🌐 {source}: p50 {l['p50'] * 1000:.0f}ms, p90 {l['p90'] * 1000:.0f}ms, "
+                         f"p99 {l['p99'] * 1000:.0f}ms, total {l['sum']:.1f}s")
+        parse = sum(p['sum'] for p in snap['parse_seconds'].values())
+        lines.append(f"   🧩 parse {parse:.1f}s | 💤 sleep {snap['sleep_seconds']:.1f}s | 🔁 retries {snap['retries']} | "
+                     f"🛑 blocked {snap['blocked_pages']} | ❌ errors {snap['errors']} | ↪️ browser fallbacks {snap['browser_fallbacks']}")
+        if snap['bottleneck']: lines.append(f"   🎯 Bottleneck: {snap['bottleneck']}")
+        return "\n".join(lines)
+
+    def export(self, directory=METRICS_DIR):
+        snap = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        for ext, text in (("json", json.dumps(snap, indent=2)), ("prom", self.prometheus(snap))):
+            path = os.path.join(directory, f"{snap['stage']}.{ext}")
+            # Write then rename: a collector scraping mid-write never sees half a file
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(f"{path}.tmp", path)
+        with open(os.path.join(directory, HISTORY_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(snap) + "\n")
+        return snap
+
+    def finish(self):
+        if self.stage is None: return
+        snap = self.export()
+        print(self.summary(snap))
+        print(f"📈 Metrics saved to '{METRICS_DIR}/{snap['stage']}.json' (+ .prom)")
+        self.stage = None  # once per run, even if called again at exit
+
+METRICS = RunMetrics()
+
+def http_get(url, headers=None, timeout=30, session=None, is_blocked=None):
+    """requests.get (or session.get) that records latency, bytes and status in METRICS.
+    is_blocked(status, text) overrides the status-code check for challenge pages."""
+    start = time.perf_counter()
+    try:
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        METRICS.record_request(time.perf_counter() - start, ok=False)
+        raise
+    blocked = is_blocked(response.status_code, response.text) if is_blocked else None
+    METRICS.record_request(time.perf_counter() - start, len(response.content), status=response.status_code,
+                           blocked=blocked, ok=response.ok)
+    return response
@@ -0,0 +1,153 @@
+import pandas as pd
+import hashlib
+import os
+import threading
+from derive_columns import derive_dashboard_columns
+
+# --- OPTIONAL COLUMNAR BACKEND ---
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --- OPTIONAL FILE WATCHING ---
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
+# --- CONFIG ---
+# TRANSFER_TABLE_DIR points every stage and the dashboard at another table (e.g. a synthetic one)
+DEFAULT_TABLE_DIR = "data/processed"
+TABLE_DIR = os.environ.get("TRANSFER_TABLE_DIR", DEFAULT_TABLE_DIR)
+CSV_FILE = f"{TABLE_DIR}/transfer_base_table.csv"
+PARQUET_FILE = f"{TABLE_DIR}/transfer_base_table.parquet"
+WRITE_CSV_EXPORT = True  # keep the CSV in step for Excel / manual review
+
+# Explicit column types. IDs are nullable integers (no more 470152.0), money is float,
+# everything else is text. Date_of_Birth stays text: Transfermarkt mixes d/m/Y and ISO.
+ID_COLUMNS = ['TM_Player_ID', 'Origin_Club_ID', 'Destination_Club_ID']
+FLOAT_COLUMNS = ['Fee_Est_M', 'Market_Value_At_Transfer', 'Market_Value_Next_Season', 'Age']
+TEXT_COLUMNS = ['Player_Name', 'Season', 'Origin_Club', 'Origin_League', 'Destination_Club',
+                'Destination_League', 'Fee_Raw', 'Transfer_Type', 'Date_of_Birth', 'Citizenship',
+                'Origin_Country', 'Destination_Country',
+                # Derived at save time for the dashboard (see derive_columns.py)
+                'UI_Type', 'Migration_Type', 'Origin_Label', 'Destination_Label']
+
+def table_output(path):
+    """Where a file built from the table goes: `path` for the real table, TABLE_DIR for any
+    other, so a run against a synthetic table never overwrites the real review lists."""
+    if os.path.normpath(TABLE_DIR) == os.path.normpath(DEFAULT_TABLE_DIR): return path
+    return os.path.join(TABLE_DIR, os.path.basename(path))
+
+def apply_schema(df):
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return df
+
+def to_arrow(df):
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        # Text columns can come back from CSV as float (all-NaN) or mixed; store them as strings
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None).map(lambda v: v if v is None else str(v))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if field.name in ID_COLUMNS: fields.append(pa.field(field.name, pa.int64()))
+        elif field.name in FLOAT_COLUMNS: fields.append(pa.field(field.name, pa.float64()))
+        elif field.name in TEXT_COLUMNS: fields.append(pa.field(field.name, pa.string()))
+        else: fields.append(field)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+def _parquet_is_current():
+    # A CSV edited by hand after the last save (e.g. in Excel) takes precedence
+    if pa is None or not os.path.exists(PARQUET_FILE): return False
+    if not os.path.exists(CSV_FILE): return True
+    return os.path.getmtime(PARQUET_FILE) >= os.path.getmtime(CSV_FILE)
+
+def table_path():
+    """The file load_table() would read right now."""
+    return PARQUET_FILE if _parquet_is_current() else CSV_FILE
+
+_CONTENT_HASHES = {}  # (path, mtime_ns, size) -> sha256 of the file's bytes
+
+def table_fingerprint():
+    """(path, sha256) of the file load_table() would read, or None if there is none.
+    The file is only re-hashed when its mtime or size moves, so polling this on every
+    rerun is a stat() call; a rewrite with identical bytes keeps the same fingerprint."""
+    path = table_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stat_key = (path, stat.st_mtime_ns, stat.st_size)
+    if stat_key not in _CONTENT_HASHES:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _CONTENT_HASHES.clear()  # only the current file is ever asked about
+        _CONTENT_HASHES[stat_key] = digest.hexdigest()
+    return path, _CONTENT_HASHES[stat_key]
+
+def watch_table(on_change, debounce=1.0):
+    """Calls on_change() from a background thread after the table files are rewritten
+    (debounced, since a save replaces the CSV and then the Parquet). Returns the running
+    watchdog observer, or None when watchdog isn't installed."""
+    if Observer is None: return None
+    targets = {os.path.abspath(CSV_FILE), os.path.abspath(PARQUET_FILE)}
+    pending = {'timer': None}
+    lock = threading.Lock()
+
+    class TableHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            paths = {os.path.abspath(event.src_path), os.path.abspath(getattr(event, 'dest_path', '') or event.src_path)}
+            if not targets & paths: return
+            with lock:
+                if pending['timer']: pending['timer'].cancel()
+                pending['timer'] = threading.Timer(debounce, on_change)
+                pending['timer'].daemon = True
+                pending['timer'].start()
+
+    os.makedirs(os.path.dirname(CSV_FILE), exist_ok=True)
+    observer = Observer()
+    observer.daemon = True
+    observer.schedule(TableHandler(), os.path.dirname(os.path.abspath(CSV_FILE)))
+    observer.start()
+    return observer
+
+def load_table(columns=None):
+    """Loads the transfer base table, preferring the typed Parquet copy. Raises FileNotFoundError."""
+    if _parquet_is_current():
+        return pd.read_parquet(PARQUET_FILE, columns=columns)
+    if not os.path.exists(CSV_FILE):
+        raise FileNotFoundError(CSV_FILE)
+    return apply_schema(pd.read_csv(CSV_FILE, low_memory=False, usecols=columns))
+
+def iter_table_chunks(chunksize, columns=None):
+    if _parquet_is_current():
+        for batch in pq.ParquetFile(PARQUET_FILE).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    for chunk in pd.read_csv(CSV_FILE, low_memory=False, usecols=columns, chunksize=chunksize):
+        yield apply_schema(chunk)
+
+def save_table(df, csv_export=WRITE_CSV_EXPORT):
+    """Writes the Parquet copy (if pyarrow is installed) and the CSV export, each atomically.
+    The dashboard's derived columns are recomputed on every save so they never go stale."""
+    os.makedirs(os.path.dirname(CSV_FILE), exist_ok=True)
+    df = derive_dashboard_columns(apply_schema(df.copy()))
+    if csv_export or pa is None:
+        df.to_csv(f"{CSV_FILE}.tmp", index=False)
+        os.replace(f"{CSV_FILE}.tmp", CSV_FILE)
+    # Parquet last, so its mtime is never older than the CSV it was written with
+    if pa is not None:
+        pq.write_table(to_arrow(df), f"{PARQUET_FILE}.tmp", compression="zstd")
+        os.replace(f"{PARQUET_FILE}.tmp", PARQUET_FILE)
@@ -1,11 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
 import random
 import re
 import os
 import urllib.parse
+import asyncio
+import argparse
+import contextlib
+import json
+from http_cache import add_cache_arguments, cache_from_args, OfflineCacheMiss
+from work_db import WorkDB, TRANSFER_KEY
+from table_store import TABLE_DIR
+from html_parsing import transfer_boxes, add_parser_arguments, set_backend, parse_report
+from run_metrics import METRICS, http_get
 
 # --- CONFIGURATION ---
 HEADERS = {
@@ -16,6 +22,12 @@ RELEVANT_SEASONS = [
     "19/20", "20/21", "21/22", "22/23", "23/24", "24/25", "25/26"
 ]
 
+MANIFEST_FILE = f"{TABLE_DIR}/scrape_manifest.json"
+LEAGUE_HISTORY_FILE = "data/raw/club_league_history.csv"
+CLUB_URLS_FILE = "data/raw/club_urls_list.csv"
+STAGING_FILE = f"{TABLE_DIR}/scrape_staging.jsonl"
+PER_HOST = 2  # open requests per host, however many --jobs (cached clubs don't count)
+
 # --- LOAD NAME MAPPING ---
 NAME_MAP = {}
 try:
@@ -26,13 +38,24 @@ except FileNotFoundError:
     print("⚠️ Warning: Name mapping file not found.")
 
 # --- LOAD LEAGUE HISTORY ---
+# Primary key is (Club_ID, Season): the IDs come straight from the page links, so a name
+# variant missing from NAME_MAP no longer turns into a TBD. The name-keyed lookup is only
+# the fallback for links without an ID.
+LEAGUE_BY_ID = {}
 LEAGUE_LOOKUP = {}
 try:
-    history_df = pd.read_csv("data/raw/club_league_history.csv")
-    for _, row in history_df.iterrows():
-        key = (row['Club_Name'].strip(), row['Season'].strip())
-        LEAGUE_LOOKUP[key] = row['League']
-    print(f"✅ Loaded League History ({len(LEAGUE_LOOKUP)} records).")
+    history_df = pd.read_csv(LEAGUE_HISTORY_FILE, dtype=str)
+    if 'Club_ID' not in history_df.columns and os.path.exists(CLUB_URLS_FILE):
+        # Older history files have no IDs; the URL list comes from the same league tables
+        urls_df = pd.read_csv(CLUB_URLS_FILE, dtype=str)[['Club_Name', 'Club_ID']].drop_duplicates('Club_Name')
+        history_df = history_df.merge(urls_df, on='Club_Name', how='left')
+    history_df['Club_Name'] = history_df['Club_Name'].str.strip()
+    history_df['Season'] = history_df['Season'].str.strip()
+    LEAGUE_LOOKUP = dict(zip(zip(history_df['Club_Name'], history_df['Season']), history_df['League']))
+    if 'Club_ID' in history_df.columns:
+        with_id = history_df.dropna(subset=['Club_ID'])
+        LEAGUE_BY_ID = dict(zip(zip(with_id['Club_ID'].str.strip(), with_id['Season']), with_id['League']))
+    print(f"✅ Loaded League History ({len(LEAGUE_LOOKUP)} records, {len(LEAGUE_BY_ID)} by Club ID).")
 except FileNotFoundError:
     print("⚠️ Warning: League history file not found.")
 
@@ -41,7 +64,9 @@ def standardize_name(name):
     name = name.strip()
     return NAME_MAP.get(name, name)
 
-def get_league_context(raw_name, season):
+def get_league_context(raw_name, season, club_id=None):
+    if club_id and (club_id, season) in LEAGUE_BY_ID:
+        return LEAGUE_BY_ID[(club_id, season)]
     std_name = standardize_name(raw_name)
     if (std_name, season) in LEAGUE_LOOKUP:
         return LEAGUE_LOOKUP[(std_name, season)]
@@ -63,75 +88,44 @@ def clean_money(value_str):
         else: return 0.0
     except: return 0.0
 
-def scrape_complete_history(club_name, club_url):
-    print(f"🔄 Scraping {club_name}...")
-    
+def parse_transfer_page(club_name, club_url, html, seasons=None):
+    seasons = seasons or RELEVANT_SEASONS
     # 1. Get Focus Club ID (from the URL we are visiting)
     focus_club_id = extract_id_from_url(club_url)
-    
-    try:
-        response = requests.get(club_url, headers=HEADERS)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return []
 
-    soup = BeautifulSoup(response.content, 'html.parser')
-    transfers = []
-    boxes = soup.find_all('div', class_='box')
+    def is_relevant_box(headline_text):
+        season_match = re.search(r'\d{2}/\d{2}', headline_text)
+        if not season_match or season_match.group(0) not in seasons: return False
+        return any(word in headline_text for word in ("Arrivals", "Zugänge", "Departures", "Abgänge"))
 
-    for box in boxes:
-        headline = box.find('h2', class_='content-box-headline')
-        if not headline: continue
-        headline_text = headline.get_text(strip=True)
+    transfers = []
 
+    # Only boxes that pass the headline check get their rows parsed
+    for headline_text, rows in transfer_boxes(html, is_relevant_box):
         # Check Season
-        season_match = re.search(r'\d{2}/\d{2}', headline_text)
-        if not season_match: continue
-        season = season_match.group(0)
-        if season not in RELEVANT_SEASONS: continue
+        season = re.search(r'\d{2}/\d{2}', headline_text).group(0)
 
         # Check Direction
-        is_arrival = False
-        if "Arrivals" in headline_text or "Zugänge" in headline_text: is_arrival = True
-        elif "Departures" in headline_text or "Abgänge" in headline_text: pass
-        else: continue
-
-        table = box.find('table')
-        if not table: continue
-        
-        rows = table.find_all('tr')
+        is_arrival = "Arrivals" in headline_text or "Zugänge" in headline_text
+
         for row in rows:
-            if row.parent.name != 'tbody': continue
-            
             # --- PLAYER ---
-            player_cell = row.find('td', class_='hauptlink')
-            if not player_cell: continue
-            player_link = player_cell.find('a')
-            if not player_link: continue
-            player_name = player_link.get_text(strip=True)
+            player_name = row['player_name']
             # Player ID
             tm_player_id = None
-            if player_link.get('href'):
-                id_match = re.search(r'/spieler/(\d+)', player_link['href'])
+            if row['player_href']:
+                id_match = re.search(r'/spieler/(\d+)', row['player_href'])
                 if id_match: tm_player_id = id_match.group(1)
 
             # --- PARTNER CLUB ---
-            partner_cell = row.find('td', class_='no-border-links')
-            if not partner_cell: continue
-            
             # Name
-            partner_name_raw = partner_cell.get_text(strip=True)
+            partner_name_raw = row['partner_name']
             
             # ID (The Magic Step ✨)
-            partner_id = None
-            partner_link_tag = partner_cell.find('a')
-            if partner_link_tag and partner_link_tag.get('href'):
-                partner_id = extract_id_from_url(partner_link_tag['href'])
+            partner_id = extract_id_from_url(row['partner_href'])
 
             # --- FEE ---
-            fee_cell = row.find_all('td', class_='rechts')
-            fee_raw = fee_cell[0].get_text(strip=True) if fee_cell else "-"
+            fee_raw = row['fee_raw']
             fee_clean = fee_raw.replace('€', '').strip()
             fee_val = clean_money(fee_raw)
             
@@ -140,9 +134,10 @@ def scrape_complete_history(club_name, club_url):
             if "free" in fee_raw.lower(): t_type = "Free Transfer"
 
             # --- MAPPING ---
-            known_club_league = get_league_context(club_name, season)
+            # Leagues are joined on (Club_ID, Season); names are only for display
+            known_club_league = get_league_context(club_name, season, focus_club_id)
             # We still try to look up the partner league if it's a known Romanian club
-            partner_league = get_league_context(partner_name_raw, season)
+            partner_league = get_league_context(partner_name_raw, season, partner_id)
             
             std_partner = standardize_name(partner_name_raw)
             std_focus = standardize_name(club_name)
@@ -178,10 +173,161 @@ def scrape_complete_history(club_name, club_url):
                     'Transfer_Type': t_type
                 })
 
-    time.sleep(random.uniform(1, 2))
     return transfers
 
+def scrape_complete_history(club_name, club_url, cache=None, seasons=None):
+    print(f"🔄 Scraping {club_name}...")
+
+    try:
+        if cache:
+            html, from_cache = cache.fetch(club_url, headers=HEADERS)
+        else:
+            response = http_get(club_url, headers=HEADERS)
+            response.raise_for_status()
+            html, from_cache = response.content, False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return None
+
+    transfers = parse_transfer_page(club_name, club_url, html, seasons)
+    # Only be polite when we actually hit the site
+    if not from_cache: METRICS.sleep(random.uniform(1, 2))
+    return transfers
+
+# --- ASYNC FETCH ENGINE ---
+class HostBudget:
+    """Per-host politeness: at most `max_concurrent` open requests per host, each slot
+    held for a random 1-2s cool-down after a page is downloaded (same pacing as the sync
+    loop). Only take a slot for a real request: a request that raises frees it at once."""
+
+    def __init__(self, max_concurrent, delay_range=(1, 2)):
+        self.max_concurrent = max_concurrent
+        self.delay_range = delay_range
+        self._slots = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        if host not in self._slots:
+            self._slots[host] = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots[host]:
+            yield
+            # Not reached when the request raised: like the sync loop, failures don't cool down
+            delay = random.uniform(*self.delay_range)
+            await asyncio.sleep(delay)
+            METRICS.record_sleep(delay)
+
+def fetch_page(url, cache=None):
+    if cache:
+        return cache.download(url, headers=HEADERS)
+    response = http_get(url, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+async def fetch_club_async(club_name, club_url, jobs_sem, budget, cache=None, seasons=None, on_done=None):
+    async with jobs_sem:
+        try:
+            # One read per page; a hit or an offline miss never reaches the host budget
+            html = cache.lookup(club_url) if cache else None
+        except OfflineCacheMiss as e:
+            print(f"❌ Error ({club_name}): {e}")
+            return None
+        if html is None:
+            print(f"🔄 Scraping {club_name}...")
+            try:
+                async with budget.slot(club_url):
+                    # requests is blocking, so each fetch runs on a worker thread
+                    html = await asyncio.to_thread(fetch_page, club_url, cache)
+            except Exception as e:
+                print(f"❌ Error ({club_name}): {e}")
+                return None
+        else:
+            print(f"💾 Cached {club_name}...")
+        data = parse_transfer_page(club_name, club_url, html, seasons)
+        print(f"✅ {club_name}: {len(data)} moves.")
+        if on_done: on_done(club_name, club_url, data)
+    return data
+
+async def scrape_all_async(club_list, jobs, per_host=PER_HOST, cache=None, seasons=None, on_done=None):
+    jobs_sem = asyncio.Semaphore(jobs)
+    budget = HostBudget(per_host)
+    tasks = [fetch_club_async(e['Club_Name'], e['Transfer_URL'], jobs_sem, budget, cache, seasons, on_done) for e in club_list]
+    # gather() keeps input order, so the output table is identical whatever finishes first
+    return await asyncio.gather(*tasks)
+
+# --- RUN MANIFEST (RESUME SUPPORT) ---
+class RunManifest:
+    """Tracks which clubs a run has finished. Rows are staged per club in a JSONL file,
+    so an interrupted run picks up where it stopped. A manifest left by a run with a
+    different season scope or mode is discarded."""
+
+    def __init__(self, seasons, incremental, path=MANIFEST_FILE, staging_path=STAGING_FILE):
+        self.path = path
+        self.staging_path = staging_path
+        self.state = {'seasons': sorted(seasons), 'incremental': incremental, 'clubs': {}}
+        self.resumed = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved.get('seasons') == self.state['seasons'] and saved.get('incremental') == incremental:
+                    self.state = saved
+                    self.resumed = True
+            except (OSError, ValueError): pass
+
+        if not self.resumed:
+            self.finish()
+
+    def is_done(self, club_url):
+        return club_url in self.state['clubs']
+
+    def record(self, club_name, club_url, rows):
+        # Staging first, manifest second: a club only counts as done once its rows are on disk
+        os.makedirs(os.path.dirname(self.staging_path), exist_ok=True)
+        with open(self.staging_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({'url': club_url, 'rows': rows}) + "\n")
+        self.state['clubs'][club_url] = {'club': club_name, 'rows': len(rows)}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def staged_rows(self):
+        rows_by_url = {}
+        if not os.path.exists(self.staging_path): return rows_by_url
+        with open(self.staging_path, encoding="utf-8") as f:
+            for line in f:
+                try: entry = json.loads(line)
+                except ValueError: continue  # torn last line from a crash
+                if self.is_done(entry['url']):
+                    rows_by_url[entry['url']] = entry['rows']
+        return rows_by_url
+
+    def finish(self):
+        for path in (self.path, self.staging_path):
+            if os.path.exists(path): os.remove(path)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape full transfer history for every club in club_urls_list.csv")
+    parser.add_argument("--jobs", type=int, default=1, help="Concurrent club fetches (1 = sequential)")
+    parser.add_argument("--per-host", type=int, default=PER_HOST, help="Max open requests per host, independent of --jobs")
+    parser.add_argument("--seasons", nargs="+", default=None, help="Only scrape these seasons, e.g. --seasons 25/26")
+    parser.add_argument("--incremental", action="store_true", help="Upsert into the working database instead of replacing its transfers")
+    parser.add_argument("--restart", action="store_true", help="Ignore an unfinished run's manifest and start over")
+    parser.add_argument("--allow-partial", action="store_true", help="Write the clubs that succeeded even if some keep failing (e.g. a 404ing URL)")
+    add_cache_arguments(parser)
+    add_parser_arguments(parser)
+    args = parser.parse_args()
+    cache = cache_from_args(args)
+    set_backend(args.parser)
+    METRICS.start("transfer_history")
+
+    seasons = args.seasons or RELEVANT_SEASONS
+    if args.seasons and not args.incremental:
+        print("⚠️ --seasons without --incremental would drop every other season. Enabling --incremental.")
+        args.incremental = True
+
     try:
         clubs_df = pd.read_csv("data/raw/club_urls_list.csv")
         club_list = clubs_df.to_dict('records')
@@ -189,20 +335,60 @@ if __name__ == "__main__":
         print("❌ Error: Run get_club_urls.py first!")
         exit()
 
-    all_data = []
-    print(f"🚀 Starting ID-Enhanced Scraper ({len(club_list)} clubs)...")
+    if args.restart:
+        RunManifest(seasons, args.incremental).finish()
+    manifest = RunManifest(seasons, args.incremental)
+    pending = [e for e in club_list if not manifest.is_done(e['Transfer_URL'])]
+    if manifest.resumed:
+        print(f"⏯️ Resuming run: {len(club_list) - len(pending)} clubs already done.")
+
+    print(f"🚀 Starting ID-Enhanced Scraper ({len(pending)} clubs, seasons {', '.join(seasons)}, {args.jobs} jobs)...")
     
-    for entry in club_list:
-        club = entry['Club_Name']
-        url = entry['Transfer_URL']
-        data = scrape_complete_history(club, url)
-        all_data.extend(data)
-        print(f"✅ {club}: {len(data)} moves.")
+    if args.jobs > 1:
+        asyncio.run(scrape_all_async(pending, args.jobs, args.per_host, cache, seasons, manifest.record))
+    else:
+        for entry in pending:
+            club = entry['Club_Name']
+            url = entry['Transfer_URL']
+            data = scrape_complete_history(club, url, cache, seasons)
+            if data is None: continue
+            manifest.record(club, url, data)
+            print(f"✅ {club}: {len(data)} moves.")
+
+    failed = [e['Club_Name'] for e in club_list if not manifest.is_done(e['Transfer_URL'])]
+    if failed and not args.allow_partial:
+        print(f"⚠️ {len(failed)} clubs failed ({', '.join(failed)}). Re-run to retry them, "
+              f"or pass --allow-partial to write the others; nothing was written.")
+        exit(1)
+    if failed:
+        print(f"⚠️ {len(failed)} clubs failed ({', '.join(failed)}). Writing the other "
+              f"{len(club_list) - len(failed)} (--allow-partial); the failed clubs' stored transfers are kept.")
+
+    # Assemble in club-list order, whichever run or worker scraped each club
+    rows_by_url = manifest.staged_rows()
+    all_data = [row for e in club_list for row in rows_by_url.get(e['Transfer_URL'], [])]
     
+    if not all_data:
+        manifest.finish()
+        print("⚠️ No transfers found for the selected seasons. Table left untouched.")
+        exit()
+
     df = pd.DataFrame(all_data)
     # Dedupe including IDs
-    df.drop_duplicates(subset=['TM_Player_ID', 'Season', 'Origin_Club', 'Destination_Club'], inplace=True)
-    
-    os.makedirs('data/processed', exist_ok=True)
-    df.to_csv("data/processed/transfer_base_table.csv", index=False)
-    print("\n🏁 Done. IDs captured.")
\ No newline at end of file
+    df.drop_duplicates(subset=TRANSFER_KEY, inplace=True)
+    METRICS.add_rows(len(df))
+
+    # Upsert keeps enrichment columns and never lets a 'TBD' replace a resolved league
+    db = WorkDB()
+    # A partial run merges: replacing would delete every transfer of the clubs that failed
+    if args.incremental or failed:
+        updated, added = db.upsert_transfers(df)
+        print(f"🔀 Merge: {updated} updated, {added} new rows.")
+    else:
+        db.replace_transfers(df)
+    db.export()
+    db.close()
+    manifest.finish()
+    if cache: print(f"💾 Cache: {cache.hits} hits, {cache.misses} misses.")
+    print(parse_report())
+    print("\n🏁 Done. IDs captured.")
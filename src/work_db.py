@@ -0,0 +1,229 @@
+import sqlite3
+import os
+import argparse
+import contextlib
+import pandas as pd
+from table_store import load_table, save_table, apply_schema, table_path, TABLE_DIR, ID_COLUMNS, FLOAT_COLUMNS
+
+# --- CONFIG ---
+# Lives next to the table it exports to, so a TRANSFER_TABLE_DIR run never writes into another table
+DB_FILE = f"{TABLE_DIR}/transfer_work.db"
+TRANSFER_KEY = ['TM_Player_ID', 'Season', 'Origin_Club', 'Destination_Club']
+# The stored columns of transfer_base_table, in export order (derived columns are added by save_table)
+BASE_COLUMNS = ['TM_Player_ID', 'Player_Name', 'Season', 'Origin_Club', 'Origin_Club_ID', 'Origin_League',
+                'Destination_Club', 'Destination_Club_ID', 'Destination_League', 'Fee_Raw', 'Fee_Est_M',
+                'Transfer_Type', 'Date_of_Birth', 'Citizenship', 'Market_Value_At_Transfer',
+                'Market_Value_Next_Season', 'Origin_Country', 'Destination_Country']
+LEAGUE_COLUMNS = ['Origin_League', 'Destination_League']
+
+def _sql_type(col):
+    if col in ID_COLUMNS: return "INTEGER"
+    if col in FLOAT_COLUMNS: return "REAL"
+    return "TEXT"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS transfers (
+    Transfer_Key TEXT PRIMARY KEY,
+    {', '.join(f'{col} {_sql_type(col)}' for col in BASE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_transfers_player ON transfers (TM_Player_ID);
+CREATE INDEX IF NOT EXISTS idx_transfers_origin ON transfers (Origin_Club_ID, Season);
+CREATE INDEX IF NOT EXISTS idx_transfers_destination ON transfers (Destination_Club_ID, Season);
+
+CREATE TABLE IF NOT EXISTS players (
+    TM_Player_ID INTEGER PRIMARY KEY, Player_Name TEXT, Date_of_Birth TEXT, Citizenship TEXT
+);
+CREATE TABLE IF NOT EXISTS clubs (
+    Club_ID INTEGER PRIMARY KEY, Club_Name TEXT
+);
+CREATE TABLE IF NOT EXISTS club_seasons (
+    Club_ID INTEGER, Season TEXT, League TEXT, Country TEXT, PRIMARY KEY (Club_ID, Season)
+);
+"""
+
+def transfer_keys(df):
+    pid = pd.to_numeric(df['TM_Player_ID'], errors='coerce').astype('Int64').astype(str)
+    return pid + '|' + df['Season'].astype(str) + '|' + df['Origin_Club'].astype(str) + '|' + df['Destination_Club'].astype(str)
+
+def _records(df, columns):
+    """Rows as tuples of plain Python values (NaN/NA -> None) for executemany."""
+    df = apply_schema(df[columns].copy())
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+class WorkDB:
+    """SQLite working database shared by the pipeline stages.
+
+    Stages write targeted UPSERT/UPDATE statements inside BEGIN IMMEDIATE transactions,
+    so a checkpoint costs O(changed rows) and two stages running at once serialize
+    their writes instead of overwriting each other's files. WAL mode lets readers run
+    alongside a writer. The CSV/Parquet files are exports made by export().
+
+    A new database is seeded from the current export, so existing data carries over."""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode: transaction() issues BEGIN/COMMIT itself
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if self.count() == 0 and os.path.exists(table_path()):
+            self.import_table(load_table())
+            print(f"🗄️ Seeded {self.path} from {table_path()} ({self.count()} transfers).")
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front, so concurrent writers wait (busy timeout)
+        # instead of failing halfway through
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transfers").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    # --- TRANSFERS ---
+    def transfers_frame(self, with_key=False):
+        """The transfers table in base-table shape (insertion order). with_key adds the
+        Transfer_Key column for update_cells()."""
+        cols = (['Transfer_Key'] if with_key else []) + BASE_COLUMNS
+        df = pd.read_sql_query(f"SELECT {', '.join(cols)} FROM transfers ORDER BY rowid", self.conn)
+        return apply_schema(df)
+
+    def import_table(self, df):
+        """Replaces every table's contents with `df` (a base-table frame)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM transfers")
+            self._upsert(conn, df, list(df.columns))
+            self._refresh_dimensions(conn)
+
+    def upsert_transfers(self, df):
+        """Inserts new transfers and updates existing ones (by TRANSFER_KEY) with the columns
+        `df` carries. Enrichment columns it doesn't carry are left alone, null values never
+        overwrite stored ones, and a 'TBD' league never replaces a resolved one.
+        Returns (updated, inserted)."""
+        keys = transfer_keys(df)
+        with self.transaction() as conn:
+            known = {k for k, in conn.execute("SELECT Transfer_Key FROM transfers")}
+            updated = int(keys.drop_duplicates().isin(known).sum())
+            self._upsert(conn, df, list(df.columns))
+            self._record_clubs(conn, df)
+        return updated, keys.nunique() - updated
+
+    def replace_transfers(self, df):
+        """A full (non-incremental) scrape: the transfers table becomes exactly `df`."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM transfers")
+            self._upsert(conn, df, list(df.columns))
+            self._record_clubs(conn, df)
+
+    def _upsert(self, conn, df, columns):
+        columns = [c for c in BASE_COLUMNS if c in columns]
+        rows = [(key,) + rec for key, rec in zip(transfer_keys(df), _records(df, columns))]
+        updates = []
+        for col in columns:
+            if col in TRANSFER_KEY: continue
+            new = f"NULLIF(excluded.{col}, 'TBD')" if col in LEAGUE_COLUMNS else f"excluded.{col}"
+            updates.append(f"{col} = COALESCE({new}, transfers.{col})")
+        conn.executemany(
+            f"INSERT INTO transfers (Transfer_Key, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+            f"ON CONFLICT (Transfer_Key) DO UPDATE SET {', '.join(updates)}",
+            rows)
+
+    def _record_clubs(self, conn, df):
+        for side in ['Origin', 'Destination']:
+            if f'{side}_Club_ID' not in df.columns: continue
+            sides = pd.DataFrame({'Club_ID': pd.to_numeric(df[f'{side}_Club_ID'], errors='coerce'),
+                                  'Club_Name': df[f'{side}_Club'], 'Season': df['Season'],
+                                  'League': df[f'{side}_League'].where(df[f'{side}_League'] != "TBD")})
+            sides = sides.dropna(subset=['Club_ID'])
+            sides['Club_ID'] = sides['Club_ID'].astype('int64')
+            conn.executemany("INSERT INTO clubs (Club_ID, Club_Name) VALUES (?, ?) "
+                             "ON CONFLICT (Club_ID) DO UPDATE SET Club_Name = excluded.Club_Name",
+                             _records(sides.drop_duplicates('Club_ID', keep='last'), ['Club_ID', 'Club_Name']))
+            leagues = sides.dropna(subset=['League']).drop_duplicates(['Club_ID', 'Season'], keep='last')
+            conn.executemany("INSERT INTO club_seasons (Club_ID, Season, League) VALUES (?, ?, ?) "
+                             "ON CONFLICT (Club_ID, Season) DO UPDATE SET League = excluded.League",
+                             _records(leagues, ['Club_ID', 'Season', 'League']))
+
+    def _refresh_dimensions(self, conn):
+        conn.execute("DELETE FROM players")
+        conn.execute("DELETE FROM clubs")
+        conn.execute("DELETE FROM club_seasons")
+        conn.execute("""INSERT OR REPLACE INTO players
+                        SELECT TM_Player_ID, MAX(Player_Name), MAX(Date_of_Birth), MAX(Citizenship)
+                        FROM transfers WHERE TM_Player_ID IS NOT NULL GROUP BY TM_Player_ID""")
+        # Both sides in one aggregate: a per-side INSERT OR REPLACE let the Destination pass
+        # overwrite a league the Origin side had resolved with its own TBD/NULL
+        sides = " UNION ALL ".join(
+            f"SELECT {side}_Club_ID AS Club_ID, {side}_Club AS Club, Season, "
+            f"NULLIF({side}_League, 'TBD') AS League, {side}_Country AS Country "
+            f"FROM transfers WHERE {side}_Club_ID IS NOT NULL" for side in ['Origin', 'Destination'])
+        conn.execute(f"INSERT INTO clubs SELECT Club_ID, MAX(Club) FROM ({sides}) GROUP BY Club_ID")
+        conn.execute(f"""INSERT INTO club_seasons SELECT Club_ID, Season, MAX(League), MAX(Country)
+                         FROM ({sides}) GROUP BY Club_ID, Season""")
+
+    # --- TARGETED UPDATES ---
+    def update_cells(self, cells, players=()):
+        """Writes buffered cell changes in one transaction. cells: {column: {Transfer_Key: value}}
+        (keys from transfers_frame(with_key=True)); players: [(pid, dob, citizenship)]
+        upserted into the players table, None keeping the stored value.
+
+        Keyed on Transfer_Key rather than rowid: a full scrape (replace_transfers) deletes and
+        re-inserts every row and SQLite hands the freed rowids to different transfers, so a
+        rowid read before it would point at someone else's row. A transfer the scrape dropped
+        is simply not updated."""
+        with self.transaction() as conn:
+            conn.executemany("""INSERT INTO players (TM_Player_ID, Date_of_Birth, Citizenship) VALUES (?, ?, ?)
+                                ON CONFLICT (TM_Player_ID) DO UPDATE SET
+                                Date_of_Birth = COALESCE(excluded.Date_of_Birth, Date_of_Birth),
+                                Citizenship = COALESCE(excluded.Citizenship, Citizenship)""", players)
+            for col, bucket in cells.items():
+                if col not in BASE_COLUMNS: raise ValueError(f"Unknown column {col}")
+                conn.executemany(f"UPDATE transfers SET {col} = ? WHERE Transfer_Key = ?",
+                                 [(None if pd.isna(v) else v, key) for key, v in bucket.items()])
+
+    def update_club_seasons(self, resolved):
+        """resolved: [(club_id, season, league, country)]. Upserts club_seasons and fills both
+        sides of every matching transfer through the (Club_ID, Season) indexes; None keeps
+        the stored value."""
+        with self.transaction() as conn:
+            conn.executemany("""INSERT INTO club_seasons (Club_ID, Season, League, Country) VALUES (?, ?, ?, ?)
+                                ON CONFLICT (Club_ID, Season) DO UPDATE SET
+                                League = COALESCE(excluded.League, League),
+                                Country = COALESCE(excluded.Country, Country)""", resolved)
+            for side in ['Origin', 'Destination']:
+                conn.executemany(f"""UPDATE transfers SET {side}_League = COALESCE(?, {side}_League),
+                                     {side}_Country = COALESCE(?, {side}_Country)
+                                     WHERE {side}_Club_ID = ? AND Season = ?""",
+                                 [(league, country, cid, season) for cid, season, league, country in resolved])
+
+    # --- EXPORTS ---
+    def export(self):
+        """Regenerates transfer_base_table (CSV + Parquet, with derived columns) from the database."""
+        df = self.transfers_frame()
+        save_table(df)
+        print(f"📤 Exported {len(df)} transfers from {self.path}.")
+        return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the pipeline's SQLite working database")
+    parser.add_argument("--import-table", action="store_true", help="Reload the database from the current CSV/Parquet export (e.g. after a hand edit)")
+    parser.add_argument("--export", action="store_true", help="Regenerate the CSV/Parquet export from the database")
+    args = parser.parse_args()
+
+    db = WorkDB()
+    if args.import_table:
+        db.import_table(load_table())
+        print(f"📥 Imported {db.count()} transfers from {table_path()}.")
+    if args.export:
+        db.export()
+    db.close()